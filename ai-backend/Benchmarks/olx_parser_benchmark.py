@@ -0,0 +1,92 @@
+# olx_parser_benchmark.py
+#
+# Micro-benchmark for DataCronJob/olx_parser.py. Parses the OLX fixture
+# search/detail pages in DataCronJob/fixtures/olx with every installed backend
+# (selectolax, BeautifulSoup+lxml, BeautifulSoup+html.parser) and reports the
+# median time per page, the speedup over html.parser and whether each backend
+# still produces the expected output, as JSON.
+#
+# Run from ai-backend/:
+#   python -m Benchmarks.olx_parser_benchmark
+#   python -m Benchmarks.olx_parser_benchmark --parsers selectolax html.parser --repeat 200 -o parsers.json
+
+import argparse
+import json
+import os
+import platform
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from DataCronJob.olx_parser import FIXTURES_DIR, available_parsers, load_fixtures, parse_fixture
+
+BASELINE_PARSER = "html.parser"
+
+
+def time_parse(name: str, html: bytes, parser: str, repeat: int) -> list:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse_fixture(name, html, parser)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def benchmark_parser(parser: str, fixtures: dict, expected: dict, repeat: int) -> dict:
+    pages = {}
+    for name, html in fixtures.items():
+        timings = time_parse(name, html, parser, repeat)
+        pages[name] = {
+            "size_kb": round(len(html) / 1024, 1),
+            "median_ms": round(float(np.median(timings)), 3),
+            "p95_ms": round(float(np.percentile(timings, 95)), 3),
+            "matches_expected": parse_fixture(name, html, parser) == expected.get(name),
+        }
+
+    return {
+        "parser": parser,
+        "total_median_ms": round(sum(p["median_ms"] for p in pages.values()), 3),
+        "all_match_expected": all(p["matches_expected"] for p in pages.values()),
+        "pages": pages,
+    }
+
+
+def run_benchmark(parsers, repeat: int = 100) -> dict:
+    fixtures = load_fixtures()
+    with open(os.path.join(FIXTURES_DIR, "expected.json"), encoding="utf-8") as f:
+        expected = json.load(f)
+
+    results = [benchmark_parser(parser, fixtures, expected, repeat) for parser in parsers]
+
+    baseline = next((r for r in results if r["parser"] == BASELINE_PARSER), None)
+    for result in results:
+        if baseline:
+            result["speedup_vs_html_parser"] = round(baseline["total_median_ms"] / result["total_median_ms"], 2)
+        print(f"✔️ {result['parser']}: {result['total_median_ms']} ms for {len(fixtures)} pages"
+              f"{'' if result['all_match_expected'] else ' ❌ output differs from expected.json'}")
+
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "repeat": repeat,
+        "fixtures": len(fixtures),
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark OLX HTML parser backends")
+    parser.add_argument("--parsers", nargs="*", default=available_parsers(), choices=available_parsers())
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("-o", "--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.parsers, args.repeat)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
@@ -0,0 +1,215 @@
+# pricing_benchmark.py
+#
+# Offline benchmark for PricePrediction/predict_price_service.py.
+# Runs the real pipeline stages on a fixture dataset (synthetic, or a local
+# Parquet snapshot) and reports per-stage timings, peak memory, model size and
+# MAE / MAPE on a held-out split for each model family, as JSON.
+#
+# Run from ai-backend/:
+#   python -m Benchmarks.pricing_benchmark
+#   python -m Benchmarks.pricing_benchmark --snapshot snapshots/latest --model "Galaxy A71"
+#   python -m Benchmarks.pricing_benchmark --families random_forest hist_gradient_boosting -o bench.json
+
+import argparse
+import json
+import pickle
+import platform
+import random
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+from PricePrediction.predict_price_service import (
+    MODEL_FAMILIES,
+    ParquetDataSource,
+    fetch_training_data,
+    predict_price_range,
+    preprocess_input_mobile,
+    preprocess_training_data,
+    to_model_features,
+    train_model,
+)
+
+
+# =====================================================
+# SYNTHETIC FIXTURE DATA
+# =====================================================
+class SyntheticDataSource:
+    """
+    Deterministic OLX-like listings for one model, shaped like the Mongo
+    documents so they go through the same fetch/validation path.
+    """
+
+    def __init__(self, rows: int = 600, seed: int = 42, base_price: int = 60000):
+        self.rows = rows
+        self.seed = seed
+        self.base_price = base_price
+
+    def load_records(self, input_model: str):
+        rng = random.Random(self.seed)
+        docs = []
+
+        for _ in range(self.rows):
+            ram = rng.choice([4, 6, 8, 12])
+            storage = rng.choice([64, 128, 256])
+            condition = rng.randint(3, 10)
+
+            doc = {
+                "brand": "Samsung",
+                "model": input_model,
+                "ram": f"{ram}GB",
+                "storage": f"{storage}GB",
+                "condition": condition,
+                "pta_approved": rng.random() > 0.25,
+                "is_panel_changed": rng.random() < 0.1,
+                "screen_crack": rng.random() < 0.08,
+                "panel_dot": rng.random() < 0.08,
+                "panel_line": rng.random() < 0.06,
+                "panel_shade": rng.random() < 0.05,
+                "camera_lens_ok": rng.random() > 0.05,
+                "fingerprint_ok": rng.random() > 0.05,
+                "with_box": rng.random() < 0.4,
+                "with_charger": rng.random() < 0.5,
+            }
+
+            price = self.base_price * (1 + 0.06 * ram / 4) * (1 + 0.04 * storage / 64)
+            price *= 0.7 + 0.03 * condition
+            for flag, factor in (("screen_crack", 0.7), ("panel_dot", 0.8), ("panel_line", 0.75),
+                                 ("panel_shade", 0.8), ("is_panel_changed", 0.8)):
+                if doc[flag]:
+                    price *= factor
+            if not doc["pta_approved"]:
+                price *= 0.75
+            if doc["with_box"]:
+                price *= 1.03
+
+            doc["price"] = int(price * rng.uniform(0.9, 1.1))
+            docs.append(doc)
+
+        return docs
+
+
+# =====================================================
+# MEASUREMENT HELPERS
+# =====================================================
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def split_holdout(mobiles, test_fraction: float, seed: int):
+    shuffled = list(mobiles)
+    random.Random(seed).shuffle(shuffled)
+    n_test = max(1, int(len(shuffled) * test_fraction))
+    return shuffled[n_test:], shuffled[:n_test]
+
+
+def accuracy(y_true: np.ndarray, y_pred: np.ndarray) -> dict:
+    errors = np.abs(y_true - y_pred)
+    return {
+        "mae": round(float(errors.mean()), 2),
+        "mape": round(float((errors / y_true).mean() * 100), 3),
+    }
+
+
+# =====================================================
+# BENCHMARK ONE MODEL FAMILY
+# =====================================================
+def benchmark_family(family: str, source, input_model: str, test_fraction: float, seed: int) -> dict:
+    tracemalloc.start()
+
+    mobiles, fetch_ms = timed(fetch_training_data, input_model, source)
+    train_set, test_set = split_holdout(mobiles, test_fraction, seed)
+
+    training_df, preprocess_ms = timed(preprocess_training_data, train_set)
+    test_df = preprocess_training_data(test_set).dropna(subset=["price", "condition_score"])
+
+    model, train_ms = timed(train_model, training_df, family)
+
+    X_test = to_model_features(test_df.drop(columns=["price"])[model.feature_names_in_])
+    y_pred, predict_ms = timed(model.predict, X_test)
+
+    # Request-path latency: one phone through preprocess + predict_price_range
+    probe = test_set[0]
+    probe_df = preprocess_input_mobile(probe)
+    _, request_ms = timed(predict_price_range, model, probe_df, training_df, probe, {})
+
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "family": family,
+        "n_train": len(training_df),
+        "n_test": len(test_df),
+        "timings_ms": {
+            "fetch": round(fetch_ms, 2),
+            "preprocess": round(preprocess_ms, 2),
+            "train": round(train_ms, 2),
+            "predict_holdout": round(predict_ms, 2),
+            "predict_single_request": round(request_ms, 2),
+        },
+        "peak_memory_mb": round(peak_bytes / 1024 / 1024, 2),
+        "model_size_kb": round(len(pickle.dumps(model)) / 1024, 1),
+        **accuracy(test_df["price"].to_numpy(dtype=float), y_pred),
+    }
+
+
+def median_run(runs: list) -> dict:
+    """Collapse repeated runs: median timings/memory, accuracy from the first run (deterministic)."""
+    result = dict(runs[0])
+    result["timings_ms"] = {
+        stage: round(float(np.median([r["timings_ms"][stage] for r in runs])), 2)
+        for stage in runs[0]["timings_ms"]
+    }
+    result["peak_memory_mb"] = round(float(np.median([r["peak_memory_mb"] for r in runs])), 2)
+    result["repeats"] = len(runs)
+    return result
+
+
+def run_benchmark(families, source, input_model: str, repeat: int = 3,
+                  test_fraction: float = 0.2, seed: int = 42) -> dict:
+    results = []
+    for family in families:
+        runs = [benchmark_family(family, source, input_model, test_fraction, seed) for _ in range(repeat)]
+        results.append(median_run(runs))
+        print(f"✔️ {family}: {results[-1]['timings_ms']['train']} ms train, MAPE {results[-1]['mape']}%")
+
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "input_model": input_model,
+        "source": type(source).__name__,
+        "test_fraction": test_fraction,
+        "seed": seed,
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark price prediction model families")
+    parser.add_argument("--families", nargs="*", default=list(MODEL_FAMILIES), choices=list(MODEL_FAMILIES))
+    parser.add_argument("--snapshot", help="Parquet snapshot directory (default: synthetic data)")
+    parser.add_argument("--model", default="Galaxy A71", help="Phone model to train on")
+    parser.add_argument("--rows", type=int, default=600, help="Synthetic dataset size")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--test-fraction", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("-o", "--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    if args.snapshot:
+        source = ParquetDataSource(args.snapshot)
+    else:
+        source = SyntheticDataSource(rows=args.rows, seed=args.seed)
+
+    report = run_benchmark(args.families, source, args.model, args.repeat, args.test_fraction, args.seed)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
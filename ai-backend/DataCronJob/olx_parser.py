@@ -0,0 +1,271 @@
+# olx_parser.py
+#
+# Pure parsing of OLX search and ad detail pages (raw HTML bytes in, plain
+# dicts out), shared by the scraper, the fixture check and the parser
+# benchmark. No network or Mongo access here.
+#
+# Backends, fastest first: selectolax (lexbor), BeautifulSoup on lxml, and
+# BeautifulSoup's pure-Python html.parser as the always-available fallback.
+# All three run the same CSS selectors and must return identical results
+# (checked against the pages in fixtures/olx).
+#
+# Selectors are the ones the scraper has always used, with tag-structure
+# fallbacks where OLX's hashed class names (h2._1093b649, ...) may change with
+# their frontend builds; the first selector that matches wins.
+#
+# The *.synthetic.html fixtures are hand-written in that markup, not captured
+# from OLX: --check guards backend parity and parser regressions, but cannot
+# notice OLX changing its live markup. Real pages still need to be recorded
+# with --record (saved under the given name, without the .synthetic suffix).
+#
+#   python olx_parser.py --check                      # parse fixtures, compare with expected.json (exit 1 on problems)
+#   python olx_parser.py --record <url> <name>        # save a live page as a new fixture
+
+import argparse
+import json
+import os
+import sys
+
+from bs4 import BeautifulSoup
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+try:
+    import lxml  # noqa: F401  (BeautifulSoup tree builder)
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+
+OLX_BASE_URL = "https://www.olx.com.pk"
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "olx")
+
+PARSERS = ("selectolax", "lxml", "html.parser")
+
+# Fixture files written by hand rather than recorded from OLX
+SYNTHETIC_SUFFIX = ".synthetic.html"
+
+# field -> selectors tried in order
+SEARCH_SELECTORS = {
+    "listing": ("li[aria-label='Listing']",),
+    "title": ("h2._1093b649", "h2"),
+    "price": ("div[aria-label='Price'] span",),
+    "location": ("span.f047db22",),
+    "link": ("a[href]",),
+}
+
+DETAIL_SELECTORS = {
+    "description": ("div[aria-label='Description'] div._7a99ad24 span", "div[aria-label='Description'] span"),
+    # rows of two spans: label, value
+    "detail_row": ("div[aria-label='Details'] div._0272c9dc.cd594ce1", "div[aria-label='Details'] div"),
+    "image": ("div.image-gallery-slide img",),
+}
+
+
+# =====================================================
+# BACKENDS
+# =====================================================
+class _LexborNode:
+    def __init__(self, node):
+        self.node = node
+
+    def select(self, css):
+        return [_LexborNode(n) for n in self.node.css(css)]
+
+    def select_one(self, css):
+        found = self.node.css_first(css)
+        return _LexborNode(found) if found is not None else None
+
+    def text(self):
+        return self.node.text().strip()
+
+    def attr(self, name):
+        return self.node.attributes.get(name)
+
+
+class _SoupNode:
+    def __init__(self, node):
+        self.node = node
+
+    def select(self, css):
+        return [_SoupNode(n) for n in self.node.select(css)]
+
+    def select_one(self, css):
+        found = self.node.select_one(css)
+        return _SoupNode(found) if found is not None else None
+
+    def text(self):
+        return self.node.get_text().strip()
+
+    def attr(self, name):
+        return self.node.get(name)
+
+
+def default_parser() -> str:
+    if LexborHTMLParser is not None:
+        return "selectolax"
+    return "lxml" if HAS_LXML else "html.parser"
+
+
+def available_parsers() -> list:
+    installed = {"selectolax": LexborHTMLParser is not None, "lxml": HAS_LXML, "html.parser": True}
+    return [p for p in PARSERS if installed[p]]
+
+
+def parse_document(html: bytes, parser: str = None):
+    parser = parser or default_parser()
+    if parser == "selectolax":
+        return _LexborNode(LexborHTMLParser(html))
+    if parser in ("lxml", "html.parser"):
+        return _SoupNode(BeautifulSoup(html, parser))
+    raise ValueError(f"Unknown parser: {parser}")
+
+
+def _first(node, selectors):
+    for css in selectors:
+        found = node.select_one(css)
+        if found is not None:
+            return found
+    return None
+
+
+def _all(node, selectors):
+    for css in selectors:
+        found = node.select(css)
+        if found:
+            return found
+    return []
+
+
+# =====================================================
+# PAGES
+# =====================================================
+def parse_search_page(html: bytes, parser: str = None) -> list:
+    """
+    Listing cards of a search results page, in page order:
+    [{"title", "price", "location", "link"}]. Cards missing any field are skipped.
+    """
+    doc = parse_document(html, parser)
+    listings = []
+
+    for card in _all(doc, SEARCH_SELECTORS["listing"]):
+        title = _first(card, SEARCH_SELECTORS["title"])
+        price = _first(card, SEARCH_SELECTORS["price"])
+        location = _first(card, SEARCH_SELECTORS["location"])
+        link = _first(card, SEARCH_SELECTORS["link"])
+
+        if not all([title, price, location, link]):
+            continue
+
+        href = link.attr("href") or ""
+        listings.append({
+            "title": title.text(),
+            "price": price.text(),
+            "location": location.text(),
+            "link": href if href.startswith("http") else OLX_BASE_URL + href,
+        })
+
+    return listings
+
+
+def parse_detail_page(html: bytes, parser: str = None) -> dict:
+    """Description, Brand/Model/Condition details and image URLs of an ad page."""
+    doc = parse_document(html, parser)
+
+    description = _first(doc, DETAIL_SELECTORS["description"])
+
+    details = {}
+    for row in _all(doc, DETAIL_SELECTORS["detail_row"]):
+        spans = row.select("span")
+        if len(spans) == 2:
+            details[spans[0].text()] = spans[1].text()
+
+    images = [img.attr("src") for img in _all(doc, DETAIL_SELECTORS["image"]) if img.attr("src")]
+
+    return {
+        "description": description.text() if description else "",
+        "brand": details.get("Brand", ""),
+        "model": details.get("Model", ""),
+        "condition": details.get("Condition", ""),
+        "images": ", ".join(images),
+    }
+
+
+# =====================================================
+# FIXTURES
+# =====================================================
+def load_fixtures() -> dict:
+    """{file name: raw bytes} of the search_*.html / detail_*.html fixture pages (recorded and synthetic)."""
+    fixtures = {}
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        if name.endswith(".html"):
+            with open(os.path.join(FIXTURES_DIR, name), "rb") as f:
+                fixtures[name] = f.read()
+    return fixtures
+
+
+def parse_fixture(name: str, html: bytes, parser: str = None):
+    if name.startswith("search_"):
+        return parse_search_page(html, parser)
+    return parse_detail_page(html, parser)
+
+
+def check_fixtures() -> list:
+    """Problems found when parsing the fixtures with every available backend (empty = OK)."""
+    with open(os.path.join(FIXTURES_DIR, "expected.json"), encoding="utf-8") as f:
+        expected = json.load(f)
+
+    problems = []
+    for name, html in load_fixtures().items():
+        if name not in expected:
+            problems.append(f"{name}: no entry in expected.json")
+            continue
+        for parser in available_parsers():
+            if parse_fixture(name, html, parser) != expected[name]:
+                problems.append(f"{name}: {parser} output differs from expected.json")
+    return problems
+
+
+def record_fixture(url: str, name: str):
+    """Save a live page as a fixture and its current parse as the expected output."""
+    import httpx
+
+    response = httpx.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=30, follow_redirects=True)
+    response.raise_for_status()
+
+    with open(os.path.join(FIXTURES_DIR, name), "wb") as f:
+        f.write(response.content)
+
+    expected_path = os.path.join(FIXTURES_DIR, "expected.json")
+    with open(expected_path, encoding="utf-8") as f:
+        expected = json.load(f)
+    expected[name] = parse_fixture(name, response.content)
+    with open(expected_path, "w", encoding="utf-8") as f:
+        json.dump(expected, f, indent=2, ensure_ascii=False)
+
+    return expected[name]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check or record OLX parser fixtures")
+    parser.add_argument("--check", action="store_true", help="Parse all fixtures with every backend")
+    parser.add_argument("--record", nargs=2, metavar=("URL", "NAME"), help="Save a live page (search_*.html / detail_*.html)")
+    args = parser.parse_args()
+
+    if args.record:
+        parsed = record_fixture(*args.record)
+        print(f"✅ Recorded {args.record[1]}:")
+        print(json.dumps(parsed, indent=2, ensure_ascii=False))
+        if not parsed or (isinstance(parsed, dict) and not any(parsed.values())):
+            print("⚠️ Nothing extracted — the OLX markup may have changed")
+    else:
+        problems = check_fixtures()
+        for problem in problems:
+            print("❌", problem)
+        if all(name.endswith(SYNTHETIC_SUFFIX) for name in load_fixtures()):
+            print("⚠️ Only synthetic fixtures: live OLX markup changes are not covered, record real pages with --record")
+        print("✅ All fixtures parse as expected" if not problems else f"{len(problems)} problem(s)")
+        sys.exit(1 if problems else 0)
@@ -1,10 +1,12 @@
-from bs4 import BeautifulSoup
+import asyncio
+import httpx
 import requests
-from time import sleep
 import random
-from urllib.parse import quote_plus
+import threading
+from urllib.parse import urlparse
 from dotenv import load_dotenv
 from pymongo import MongoClient
+from collections import Counter
 from datetime import datetime, timezone
 from bson import ObjectId
 import os
@@ -13,6 +15,8 @@ import json
 import re
 
 from models import UsedMobile
+from olx_parser import parse_detail_page, parse_search_page
+from phone_matcher import title_matches_model
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_google_genai import ChatGoogleGenerativeAI
@@ -25,6 +29,26 @@ load_dotenv()
 BASE_URL = "https://www.olx.com.pk/mobile-phones_c1411"
 HEADERS = {"User-Agent": "Mozilla/5.0"}
 
+# Crawler politeness: detail pages fetched concurrently, requests per host
+# limited by a token bucket, transient failures retried with backoff
+DETAIL_CONCURRENCY = int(os.getenv("OLX_DETAIL_CONCURRENCY", 4))
+REQUESTS_PER_SECOND = float(os.getenv("OLX_REQUESTS_PER_SECOND", 1.0))
+REQUEST_BURST = int(os.getenv("OLX_REQUEST_BURST", 3))
+MAX_RETRIES = 3
+RETRY_BACKOFF_SECONDS = 2.0
+REQUEST_TIMEOUT_SECONDS = 30
+
+# Incremental crawling: stop once a page reaches listings seen in earlier runs
+# (after catching up with the backlog a cut-short run left behind)
+MAX_NEW_LISTINGS_PER_RUN = 150
+MAX_SEEN_LINKS = 1000
+
+# Listing outcomes (counted separately per run)
+NEW = "new"              # extracted and stored
+DUPLICATE = "duplicate"  # already stored, or already seen by an earlier run
+MISMATCH = "mismatch"    # not the requested model (title pre-filter or LLM)
+FAILED = "failed"        # fetch / LLM / validation error, retried next run
+
 # Mongo Setup
 MONGO_URI = os.getenv("MONGO_CONNECTION_STRING")
 DB_NAME = "MobileDB"
@@ -35,6 +59,10 @@ db = client[DB_NAME]
 db[COLLECTION_NAME].create_index([("link", 1)], unique=True)   # Ensure link uniqueness, no duplicates
 db[COLLECTION_NAME].create_index([("extraction_date", 1)], expireAfterSeconds=5184000)   # 60 days TTL 
 
+# Per (brand, model) crawl state: recently seen links, whether the last run
+# completed and, if not, the oldest listing it reached (frontier_link)
+crawl_state_collection = db["crawl_state"]
+
 
 # LLM Setup
 llm = ChatOpenAI(
@@ -174,6 +202,7 @@ combined_chain = combined_prompt | llm | StrOutputParser()
 # Rate Limit Handler
 # ============================================================
 last_gemini_call = 0
+_llm_call_lock = threading.Lock()
 
 
 SCRAPINGBEE_API_KEY = os.getenv("SCRAPINGBEE_API_KEY")
@@ -197,14 +226,16 @@ def fetch(url):
 
 def rate_limit_pause():
     global last_gemini_call
-    now = time.time()
-    elapsed = now - last_gemini_call
-    min_interval = 6  # Gemini calls every 6 seconds
+    # Extractions run in worker threads; the lock keeps the spacing global
+    with _llm_call_lock:
+        now = time.time()
+        elapsed = now - last_gemini_call
+        min_interval = 6  # Gemini calls every 6 seconds
 
-    if elapsed < min_interval:
-        time.sleep(min_interval - elapsed)
+        if elapsed < min_interval:
+            time.sleep(min_interval - elapsed)
 
-    last_gemini_call = time.time()
+        last_gemini_call = time.time()
 
 
 
@@ -298,22 +329,39 @@ def save_to_db(mobile: UsedMobile, link: str):
     try:
         collection.insert_one(data)
         print("✅ Saved new listing:", link)
-        return True
+        return NEW
 
     except Exception as e:
         if "duplicate key error" in str(e):
             print("⚠️ Duplicate listing — skipping:", link)
-            return False
+            return DUPLICATE
 
         print("❌ MongoDB Insert Error:", e)
-        return False
+        return FAILED
+
+
 
+def filter_new_listings(candidates: list) -> list:
+    """Drop listings whose link is already stored (one $in query per search page)."""
+    if not candidates:
+        return []
+
+    links = [ad["link"] for ad in candidates]
+    known = {
+        doc["link"]
+        for doc in db[COLLECTION_NAME].find({"link": {"$in": links}}, {"_id": 0, "link": 1})
+    }
+    if known:
+        print(f"⏭️ Skipping {len(known)} already stored listings")
+
+    return [ad for ad in candidates if ad["link"] not in known]
 
 
 # ============================================================
 # Combined Extraction + Verification
 # ============================================================
 def extract_data(data: dict, model, brand):
+    """Verify + extract one listing and store it. Returns NEW, DUPLICATE, MISMATCH or FAILED."""
     try:
         rate_limit_pause()
 
@@ -330,7 +378,7 @@ def extract_data(data: dict, model, brand):
 
         if llm_result == "skip":
             print("❌ Skipped (Model mismatch):", data.get("title", ""))
-            return False
+            return MISMATCH
 
         sanitized = sanitize_llm_json(llm_result)
         mobile = UsedMobile.model_validate_json(sanitized)
@@ -340,21 +388,146 @@ def extract_data(data: dict, model, brand):
         images = data.get("images", "")
         mobile.images = [img.strip() for img in images.split(",") if img.strip()]
 
-        success = save_to_db(mobile, data["link"])
+        status = save_to_db(mobile, data["link"])
 
-        if success:
+        if status == NEW:
             print(f"✅ Extracted: {mobile.model} with title: {data.get('title', '')}")
-            return True
+        return status
 
     except Exception as e:
         print("❌ LLM Extraction Failed:", e)
-        return False
+        return FAILED
+
+
+# ============================================================
+# Crawl State
+# ============================================================
+def crawl_key(model: str, brand: str) -> str:
+    return f"{brand} {model}".strip().lower()
+
+
+def get_crawl_state(model: str, brand: str) -> dict:
+    return crawl_state_collection.find_one({"_id": crawl_key(model, brand)}) or {}
+
+
+def save_crawl_state(model: str, brand: str, completed: bool, frontier_link, seen_links: list, counts: Counter):
+    """
+    Record whether the run completed and the frontier the next run must reach
+    before stopping early (None once completed), append this run's seen links
+    (capped) and its counters.
+    """
+    update = {
+        "$set": {
+            "brand": brand,
+            "model": model,
+            "completed": completed,
+            "frontier_link": frontier_link,
+            "last_run": {status: counts.get(status, 0) for status in (NEW, DUPLICATE, MISMATCH, FAILED)},
+            "updated_at": datetime.now(timezone.utc),
+        },
+    }
+    if seen_links:
+        update["$push"] = {"seen_links": {"$each": seen_links, "$slice": -MAX_SEEN_LINKS}}
+
+    crawl_state_collection.update_one({"_id": crawl_key(model, brand)}, update, upsert=True)
+
+
+# ============================================================
+# Async HTTP (pooled client, per-host token bucket, retries)
+# ============================================================
+class TokenBucket:
+    """`rate` requests per second on average, bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def host_bucket(buckets: dict, url: str) -> TokenBucket:
+    """
+    The url's host bucket from `buckets` ({host: TokenBucket}). Buckets hold an
+    asyncio.Lock bound to the running event loop, so each crawl (one
+    asyncio.run) creates its own dict next to its HTTP client.
+    """
+    host = urlparse(url).netloc
+    if host not in buckets:
+        buckets[host] = TokenBucket(REQUESTS_PER_SECOND, REQUEST_BURST)
+    return buckets[host]
+
+
+async def fetch_html(client: httpx.AsyncClient, url: str, buckets: dict):
+    """GET a page politely (raw bytes); retries timeouts, 429 and 5xx with exponential backoff. None on failure."""
+    for attempt in range(MAX_RETRIES + 1):
+        await host_bucket(buckets, url).acquire()
+        try:
+            response = await client.get(url)
+            if response.status_code == 429 or response.status_code >= 500:
+                raise httpx.HTTPStatusError(f"HTTP {response.status_code}", request=response.request, response=response)
+            response.raise_for_status()
+            return response.content
+
+        except (httpx.TransportError, httpx.HTTPStatusError) as e:
+            status = e.response.status_code if isinstance(e, httpx.HTTPStatusError) else None
+            if (status is not None and status != 429 and status < 500) or attempt == MAX_RETRIES:
+                print(f"❌ Fetch failed ({url}):", e)
+                return None
+
+            delay = RETRY_BACKOFF_SECONDS * (2 ** attempt) + random.uniform(0, 1)
+            retry_after = e.response.headers.get("Retry-After") if status else None
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, int(retry_after))
+            await asyncio.sleep(delay)
+
+
+def new_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        headers=HEADERS,
+        timeout=REQUEST_TIMEOUT_SECONDS,
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=DETAIL_CONCURRENCY + 1, max_keepalive_connections=DETAIL_CONCURRENCY + 1)
+    )
 
 
 # ============================================================
 # Scrape OLX Listings
 # ============================================================
-def get_ads_from_page(page_num, model_query, brand):
+async def scrape_ad(client, buckets, semaphore, ad: dict, model_query, brand):
+    """Fetch one ad's detail page (bounded concurrency) and run the extraction. Returns its status."""
+    try:
+        async with semaphore:
+            html = await fetch_html(client, ad["link"], buckets)
+        if html is None:
+            return FAILED
+
+        data = {**ad, **parse_detail_page(html)}
+
+        # LLM + Mongo calls are blocking; run them off the event loop
+        return await asyncio.to_thread(extract_data, data, model_query, brand)
+
+    except Exception as e:
+        print("Skipping Ad, Error:", e)
+        return FAILED
+
+
+async def get_ads_from_page(client, buckets, page_num, model_query, brand, seen_links=frozenset()):
+    """
+    Scrape one search page. Returns (listing links in page order, {link: status}),
+    or None when the page could not be fetched.
+    """
 
     if brand.lower() not in model_query.lower():
         full_query = f"{brand} {model_query}"
@@ -365,109 +538,135 @@ def get_ads_from_page(page_num, model_query, brand):
     url = f"https://www.olx.com.pk/items/q-{search_term}?page={page_num}"
     print(f"Scraping Page URL: {url}")
 
-    scraper = requests.Session()
-    scraper.headers.update(HEADERS)
-    #res = fetch(url)
-    res = scraper.get(url)
-    soup = BeautifulSoup(res.text, "html.parser")
+    html = await fetch_html(client, url, buckets)
+    if html is None:
+        return None
 
-    ads = soup.select("li[aria-label='Listing']")
-    listings = []
+    links, statuses, candidates = [], {}, []
 
-    for ad in ads:
-        try:
-            title_tag = ad.select_one("h2._1093b649")
-            price_tag = ad.select_one("div[aria-label='Price'] span")
-            location_tag = ad.select_one("span.f047db22")
-            link_tag = ad.find("a", href=True)
-
-            if not all([title_tag, price_tag, location_tag, link_tag]):
-                continue
-
-            title = title_tag.text.strip()
-            price = price_tag.text.strip()
-            location = location_tag.text.strip()
-            link = "https://www.olx.com.pk" + link_tag["href"]
-
-            #ad_res = fetch(link)
-            ad_res = scraper.get(link)
-            ad_soup = BeautifulSoup(ad_res.text, "html.parser")
-
-            desc_tag = ad_soup.select_one("div[aria-label='Description'] div._7a99ad24 span")
-            description = desc_tag.text.strip() if desc_tag else ""
-
-            details = {}
-            detail_tags = ad_soup.select("div[aria-label='Details'] div._0272c9dc.cd594ce1")
-
-            for detail in detail_tags:
-                spans = detail.find_all("span")
-                if len(spans) == 2:
-                    details[spans[0].text.strip()] = spans[1].text.strip()
-
-            image_tags = ad_soup.select("div.image-gallery-slide img")
-            image_urls = [img['src'] for img in image_tags if img.get('src')]
-
-            data = {
-                "title": title,
-                "price": price,
-                "location": location,
-                "link": link,
-                "description": description,
-                "brand": details.get("Brand", ""),
-                "model": details.get("Model", ""),
-                "condition": details.get("Condition", ""),
-                "images": ", ".join(image_urls)
-            }
-
-            success = extract_data(data, model_query, brand)
-            if success:
-                listings.append(data)
-
-        except Exception as e:
-            print("Skipping Ad, Error:", e)
+    for ad in parse_search_page(html):
+        link = ad["link"]
+        links.append(link)
+
+        # Already handled by an earlier run (stored or rejected)
+        if link in seen_links:
+            statuses[link] = DUPLICATE
+            continue
+
+        # Cheap local check before fetching the ad page and calling the LLM
+        if not title_matches_model(ad["title"], model_query, brand):
+            print("❌ Skipped (title mismatch):", ad["title"])
+            statuses[link] = MISMATCH
             continue
 
-    return listings
+        candidates.append(ad)
+
+    # Known listings never reach the detail fetch or the LLM (blocking Mongo query, off the loop)
+    new_candidates = await asyncio.to_thread(filter_new_listings, candidates)
+    new_links = {ad["link"] for ad in new_candidates}
+    for ad in candidates:
+        if ad["link"] not in new_links:
+            statuses[ad["link"]] = DUPLICATE
+
+    # Detail pages are fetched concurrently; results keep the page order
+    semaphore = asyncio.Semaphore(DETAIL_CONCURRENCY)
+    results = await asyncio.gather(*[
+        scrape_ad(client, buckets, semaphore, ad, model_query, brand) for ad in new_candidates
+    ])
+    for ad, status in zip(new_candidates, results):
+        statuses[ad["link"]] = status
+
+    return links, statuses
 
 
 # ============================================================
 # Main Scraper Function
 # ============================================================
-def scrape_used_data(model: str, brand: str):
+async def scrape_used_data_async(model: str, brand: str):
+    """
+    Crawl search pages newest first until a page ends in already-crawled
+    territory (its oldest listing is stored or was seen by an earlier run),
+    the results run out, or MAX_NEW_LISTINGS_PER_RUN listings were stored.
+
+    A run cut short (listing limit, failed page fetch) leaves older listings
+    uncrawled and saves the oldest listing it reached as the frontier. The next
+    run only stops early once it is past that frontier, so the backlog between
+    the frontier and the last completed crawl is picked up.
+    """
     print(f"🚀 Collecting data for model: {model}")
 
-    count_saved = 0
+    state = get_crawl_state(model, brand)
+    seen_links = set(state.get("seen_links", []))
+    frontier_link = state.get("frontier_link")
+    counts = Counter()
+    crawled_links, oldest_link = [], None
+    completed = False
     page_num = 1
 
     try:
-        while True:
-            listings_count = 0
-
-            listings = get_ads_from_page(page_num, model, brand)
+        buckets = {}
+        async with new_http_client() as client:
+            while True:
+                page = await get_ads_from_page(client, buckets, page_num, model, brand, seen_links)
+                if page is None:
+                    print(f"❌ Could not fetch page {page_num}. Stopping.")
+                    break
+
+                links, statuses = page
+                if not links:
+                    print(f"No more listings on page {page_num}. Stopping.")
+                    completed = True
+                    break
+
+                oldest_link = links[-1]
+                counts.update(statuses.values())
+                # Failed listings are not recorded, so the next run retries them
+                crawled_links += [
+                    link for link, status in statuses.items()
+                    if status != FAILED and link not in seen_links
+                ]
+
+                if counts[NEW] >= MAX_NEW_LISTINGS_PER_RUN:
+                    print(f"Reached limit of {MAX_NEW_LISTINGS_PER_RUN} new listings. Stopping.")
+                    break
+
+                # Results are newest first: past the oldest listing of this page everything is known,
+                # unless an earlier run was cut short and its backlog still lies ahead
+                if frontier_link is None and statuses.get(links[-1]) == DUPLICATE:
+                    print(f"Reached already crawled listings on page {page_num}. Stopping.")
+                    completed = True
+                    break
+
+                if frontier_link in links:
+                    print(f"Reached the previous run's frontier on page {page_num}, catching up.")
+                    frontier_link = None
+
+                page_num += 1
 
-            # We no longer store listings, we only count them
-            for _ in listings:
-                listings_count += 1
-                count_saved += 1
+    except Exception as e:
+        print("❌ Error while scraping data:", e)
 
-            if listings_count == 0:
-                print(f"No more listings on page {page_num}. Stopping.")
-                break
+    # Cut short: the next run must get past the older of the two frontiers
+    if completed:
+        frontier_link = None
+    elif frontier_link is None:
+        frontier_link = oldest_link
+    save_crawl_state(model, brand, completed, frontier_link, list(dict.fromkeys(crawled_links)), counts)
 
-            if count_saved >= 150:
-                print("Reached limit of 150 successful extractions. Stopping.")
-                break
+    print(
+        f"📦 {model}: {counts[NEW]} new, {counts[DUPLICATE]} duplicate, "
+        f"{counts[MISMATCH]} mismatched, {counts[FAILED]} failed ({page_num} page(s))"
+    )
+    return counts[NEW]
 
-            page_num += 1
-            sleep(random.uniform(3, 6))
 
-    except Exception as e:
-        print("❌ Error while scraping data:", e)
-
-    print(f"📦 Total listings saved to DB: {count_saved}")
+def scrape_used_data(model: str, brand: str):
+    """Blocking entry point used by the cron job."""
+    return asyncio.run(scrape_used_data_async(model, brand))
 
 
 # ============================================================
 # TEST RUN
 # ============================================================
-scrape_used_data("Pixel 6A", "Google")
+if __name__ == "__main__":
+    scrape_used_data("Pixel 6A", "Google")
@@ -0,0 +1,246 @@
+# phone_catalogue.py
+#
+# Canonical phone entities built from YouTube review extractions. `phones`
+# keeps one document per (video_id, phone_name); `phone_catalogue` keeps one
+# document per handset, so "Infinix GT 20 Pro", "infinix gt20 pro" and
+# "Infinix GT 20 Pro 5G" reviewed in three videos become one entity with three
+# provenance entries.
+#
+# Entities are keyed by phone_matcher.name_key, which starts with the brand
+# ("oneplus 12", "xiaomi 12"). Resolution: exact lookup on the key, then a
+# trigram lookup restricted to the same brand (index on brand + `ngrams`)
+# scored with phone_matcher.key_similarity, so brand, model numbers and
+# variants (Pro/Plus/Max/...) must agree. Names without a recognizable brand
+# only ever match other brand-less entities.
+
+import threading
+from datetime import datetime
+
+from pymongo import ReplaceOne
+
+from phone_matcher import DEFAULT_THRESHOLD, MAX_CANDIDATES, key_similarity, name_identity, name_key, name_ngrams
+
+MAX_SOURCES = 20
+DESCRIPTIONS_PER_PHONE = 2
+
+# Same lifetime as the `phones` documents
+CATALOGUE_TTL_SECONDS = 60 * 24 * 60 * 60
+
+# Merges read entities and write them back whole, so two channels merging the
+# same handset at once would drop one another's sources: run them one at a time
+_merge_lock = threading.Lock()
+
+
+# =====================================================
+# RESOLUTION
+# =====================================================
+def ensure_catalogue_indexes(collection):
+    collection.create_index("keys")
+    collection.create_index([("brand", 1), ("ngrams", 1)])
+    collection.create_index([("price_range", -1), ("phone_name", 1)])
+    collection.create_index("updated_at", expireAfterSeconds=CATALOGUE_TTL_SECONDS)
+
+
+def key_brand(key: str):
+    return name_identity(key)[0]
+
+
+def best_match(key: str, candidates):
+    """Id of the candidate entity whose keys best match `key` (above the threshold), or None."""
+    best_id, best_score = None, DEFAULT_THRESHOLD
+    for candidate in candidates:
+        for candidate_key in candidate.get("keys", []):
+            score = key_similarity(key, candidate_key)
+            if score >= best_score:
+                best_id, best_score = candidate["_id"], score
+    return best_id
+
+
+def load_entities(collection, keys: list) -> dict:
+    """
+    Catalogue entities for a batch of name keys: {key: entity}, keys without a
+    match left out. At most three reads however many keys: one exact lookup on
+    `keys`, one same-brand trigram lookup for the rest (scored in memory), and
+    one fetch of the entities that lookup picked.
+    """
+    keys = list(dict.fromkeys(k for k in keys if k))
+    if not keys:
+        return {}
+
+    resolved = {}
+    for entity in collection.find({"keys": {"$in": keys}}):
+        for key in entity["keys"]:
+            resolved[key] = entity
+
+    unresolved = [k for k in keys if k not in resolved]
+    if not unresolved:
+        return resolved
+
+    grams = {key: set(name_ngrams(key)) for key in unresolved}
+    candidates = list(collection.find(
+        {
+            "brand": {"$in": list({key_brand(k) for k in unresolved})},
+            "ngrams": {"$in": sorted(set().union(*grams.values()))},
+        },
+        {"keys": 1, "brand": 1, "ngrams": 1}
+    ))
+
+    matches = {}
+    for key in unresolved:
+        brand = key_brand(key)
+        same_brand = [c for c in candidates if c.get("brand") == brand]
+        same_brand.sort(key=lambda c: len(grams[key] & set(c.get("ngrams", []))), reverse=True)
+        best_id = best_match(key, same_brand[:MAX_CANDIDATES])
+        if best_id is not None:
+            matches[key] = best_id
+
+    if matches:
+        by_id = {e["_id"]: e for e in resolved.values()}
+        missing = [i for i in set(matches.values()) if i not in by_id]
+        if missing:
+            by_id.update({e["_id"]: e for e in collection.find({"_id": {"$in": missing}})})
+        resolved.update({key: by_id[i] for key, i in matches.items() if i in by_id})
+
+    return resolved
+
+
+def resolve_phone(collection, phone_name: str):
+    """Existing catalogue entity for the name, or None."""
+    key = name_key(phone_name)
+    return load_entities(collection, [key]).get(key)
+
+
+# =====================================================
+# MERGE
+# =====================================================
+def _summarize(entity: dict):
+    """Entity-level price_range/description from its newest provenance entries."""
+    sources = sorted(entity["sources"], key=lambda s: s["added_at"], reverse=True)
+
+    entity["price_range"] = next(
+        (s["price_range"] for s in sources if s.get("price_range") is not None), None
+    )
+
+    descriptions = list(dict.fromkeys(s["description"] for s in sources if s.get("description")))
+    entity["description"] = " ".join(descriptions[:DESCRIPTIONS_PER_PHONE])
+
+
+def _merged_entity(known: dict, video_id: str, phone: dict, pending: dict) -> dict:
+    """
+    Catalogue entity with the phone merged in (not yet written). `known` maps
+    name keys to stored entities (load_entities); entities already merged in
+    this batch (`pending`, by id) take precedence over the stored copy.
+    """
+    phone_name = (phone.get("phone_name") or "").strip()
+    key = name_key(phone_name)
+    now = datetime.utcnow()
+
+    entity = next((e for e in pending.values() if key in e["keys"]), None)
+    if entity is None:
+        entity = known.get(key)
+        if entity is not None:
+            entity = pending.get(entity["_id"], entity)
+
+    entity = entity or {
+        "_id": key,
+        "brand": key_brand(key),
+        "phone_name": phone_name,
+        "keys": [],
+        "ngrams": [],
+        "sources": [],
+        "created_at": now,
+    }
+
+    if key not in entity["keys"]:
+        entity["keys"].append(key)
+        entity["ngrams"] = sorted(set(entity["ngrams"]) | set(name_ngrams(key)))
+
+    # Re-processing a video replaces its entry instead of duplicating it
+    entity["sources"] = [s for s in entity["sources"] if s["video_id"] != video_id]
+    entity["sources"].append({
+        "video_id": video_id,
+        "phone_name": phone_name,
+        "description": phone.get("description", ""),
+        "price_range": phone.get("price_range"),
+        "added_at": phone.get("created_at") or now,
+    })
+    entity["sources"] = entity["sources"][-MAX_SOURCES:]
+
+    _summarize(entity)
+    entity["video_count"] = len(entity["sources"])
+    entity["updated_at"] = now
+    return entity
+
+
+def merge_phone(collection, video_id: str, phone: dict) -> str:
+    """
+    Resolve an extracted phone against the catalogue and merge it in,
+    keeping one provenance entry per video. Returns the entity id.
+    """
+    key = name_key(phone.get("phone_name") or "")
+    with _merge_lock:
+        entity = _merged_entity(load_entities(collection, [key]), video_id, phone, {})
+        collection.replace_one({"_id": entity["_id"]}, entity, upsert=True)
+    return entity["_id"]
+
+
+def merge_phones(collection, video_id: str, phones: list, repriced: set = None):
+    """
+    merge_phone for all phones of one video: the entities are loaded in one
+    batch (load_entities) and written with a single unordered bulk_write,
+    under the merge lock. Returns the pymongo BulkWriteResult (None when nothing to write).
+
+    When given, `repriced` receives the old and new price_range of every
+    existing entity whose price_range the merge changes (filled before the
+    write), so the recommendation views of both budgets can be rebuilt.
+    """
+    phones = [p for p in phones if name_key((p.get("phone_name") or "").strip())]
+    if not phones:
+        return None
+
+    with _merge_lock:
+        known = load_entities(collection, [name_key(p["phone_name"]) for p in phones])
+
+        previous_prices = {e["_id"]: e.get("price_range") for e in known.values()}
+
+        pending = {}
+        for phone in phones:
+            entity = _merged_entity(known, video_id, phone, pending)
+            pending[entity["_id"]] = entity
+
+        if repriced is not None:
+            for _id, entity in pending.items():
+                if _id in previous_prices and previous_prices[_id] != entity["price_range"]:
+                    repriced.update(p for p in (previous_prices[_id], entity["price_range"]) if p is not None)
+
+        return collection.bulk_write(
+            [ReplaceOne({"_id": _id}, entity, upsert=True) for _id, entity in pending.items()],
+            ordered=False
+        )
+
+
+def rebuild_catalogue(phones_collection, catalogue_collection) -> int:
+    """Rebuild the catalogue from scratch from the existing per-video `phones` documents."""
+    # Entities keyed before the brand was part of the key may mix handsets; start over
+    catalogue_collection.delete_many({})
+    ensure_catalogue_indexes(catalogue_collection)
+
+    count = 0
+    for doc in phones_collection.find({}, {"_id": 0}).sort("created_at", 1):
+        if not doc.get("phone_name"):
+            continue
+        merge_phone(catalogue_collection, doc.get("video_id"), doc)
+        count += 1
+
+    return count
+
+
+if __name__ == "__main__":
+    import os
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    load_dotenv()
+    db = MongoClient(os.getenv("MONGO_CONNECTION_STRING"))["MobileDB"]
+    merged = rebuild_catalogue(db["phones"], db["phone_catalogue"])
+    print(f"✅ Merged {merged} phone documents into {db['phone_catalogue'].count_documents({})} catalogue entities")
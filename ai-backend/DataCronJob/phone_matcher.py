@@ -0,0 +1,264 @@
+# phone_matcher.py
+#
+# Phone name matching shared by the transcript pipeline (consolidating the
+# phones extracted from one video), the phone catalogue and the OLX scraper
+# (pre-filtering listing titles before the LLM check).
+#
+# Names are normalized to a key: the brand (written out or implied by a series
+# word such as "iPhone", "Galaxy", "Redmi") followed by the model tokens, with
+# noise dropped (PTA/official, storage like "8/128", "256GB", 4G/5G unless
+# asked for); "gt20" -> "gt 20". Two names can only match when their identity
+# agrees: brand, model numbers / series letters and variant words (Pro, Plus,
+# Ultra, ...), so "OnePlus 12" never merges with "Xiaomi 12" and "iPhone 15"
+# never with "iPhone 15 Pro". Within the same identity the score is the
+# Jaccard similarity of character trigrams, which absorbs spacing and spelling
+# noise.
+#
+# PhoneMatcher keeps a trigram inverted index partitioned by identity, so
+# matching a name only scores entries with the same brand/model number/variant
+# that share trigrams with it, instead of every name seen so far.
+
+import re
+from collections import Counter, defaultdict
+
+# Brand names, as written -> canonical brand (dropped from the body of the key, used as its prefix)
+BRAND_TOKENS = {
+    "apple": "apple", "samsung": "samsung", "xiaomi": "xiaomi", "infinix": "infinix",
+    "tecno": "tecno", "oppo": "oppo", "vivo": "vivo", "realme": "realme", "oneplus": "oneplus",
+    "nokia": "nokia", "motorola": "motorola", "moto": "motorola", "huawei": "huawei",
+    "honor": "honor", "google": "google", "nothing": "nothing", "itel": "itel", "sparx": "sparx",
+    "zte": "zte", "sony": "sony", "asus": "asus", "lenovo": "lenovo",
+}
+
+# Series words that imply the brand; kept in the key ("galaxy s 23")
+SERIES_BRANDS = {
+    "iphone": "apple", "galaxy": "samsung", "redmi": "xiaomi", "poco": "xiaomi", "mi": "xiaomi",
+    "pixel": "google", "camon": "tecno", "spark": "tecno", "pova": "tecno", "phantom": "tecno",
+    "reno": "oppo", "nord": "oneplus", "narzo": "realme", "razr": "motorola", "rog": "asus",
+}
+
+BRANDS = set(BRAND_TOKENS.values())
+
+# Brand/series words that are also plain English; not trusted as brand evidence in listing titles
+AMBIGUOUS_BRAND_WORDS = {"nothing", "honor", "mi", "spark"}
+
+# Words that never identify a model
+FILLER_TOKENS = {
+    "smartphone", "phone", "mobile", "new", "the", "pta", "approved", "official", "non",
+    "dual", "sim", "gb", "tb", "ram", "rom",
+}
+
+NETWORK_TOKENS = {"4g", "5g", "lte"}
+
+VARIANT_TOKENS = {"pro", "plus", "max", "ultra", "lite", "mini", "fe", "neo", "prime", "edge", "note", "s"}
+
+# Storage / RAM: "8/128", "8 + 256", "256GB", "1 TB"
+_MEMORY = re.compile(r"\b\d+\s*[/+]\s*\d+\b|\b\d+\s*(gb|tb)\b")
+
+DEFAULT_THRESHOLD = 0.75
+MAX_CANDIDATES = 10
+
+
+# =====================================================
+# NORMALIZATION
+# =====================================================
+def name_tokens(phone_name: str) -> list:
+    text = (phone_name or "").lower()
+    text = re.sub(r"\bone\s+plus\b", "oneplus", text)
+    text = _MEMORY.sub(" ", text).replace("+", " plus ")
+    text = re.sub(r"[^a-z0-9]+", " ", text)
+    # "gt20" -> "gt 20", "a55" -> "a 55", "20pro" -> "20 pro"; keeps "5g"/"6a"/"52s" whole
+    text = re.sub(r"(?<=[a-z])(?=\d)|(?<=\d)(?=[a-z]{2,})", " ", text)
+    return text.split()
+
+
+def name_brand(phone_name: str, brand: str = ""):
+    """Canonical brand of a name: the given brand, a brand word, or a series word ("iPhone")."""
+    for token in name_tokens(brand) + name_tokens(phone_name):
+        if token in BRAND_TOKENS:
+            return BRAND_TOKENS[token]
+        if token in SERIES_BRANDS:
+            return SERIES_BRANDS[token]
+    return None
+
+
+def name_key(phone_name: str, ignore_network: bool = True, brand: str = "") -> str:
+    dropped = FILLER_TOKENS | NETWORK_TOKENS if ignore_network else FILLER_TOKENS
+    tokens = [t for t in name_tokens(phone_name) if t not in dropped and t not in BRAND_TOKENS]
+    canonical = name_brand(phone_name, brand)
+    if canonical:
+        tokens.insert(0, canonical)
+    return " ".join(tokens) or " ".join(name_tokens(phone_name))
+
+
+def name_ngrams(key: str, n: int = 3) -> list:
+    padded = f" {key} "
+    return sorted({padded[i:i + n] for i in range(len(padded) - n + 1)})
+
+
+def _is_identity_token(token: str) -> bool:
+    # model numbers ("15", "6a", "52s"), series letters ("a", "gt") and network suffixes
+    return any(c.isdigit() for c in token) or len(token) <= 2
+
+
+def name_identity(key: str):
+    """(brand, model number/series tokens, variant words); all must agree for a match."""
+    tokens = key.split()
+    brand = tokens[0] if tokens and tokens[0] in BRANDS else None
+    if brand:
+        tokens = tokens[1:]
+    return (
+        brand,
+        tuple(t for t in tokens if _is_identity_token(t) and t not in VARIANT_TOKENS),
+        frozenset(t for t in tokens if t in VARIANT_TOKENS),
+    )
+
+
+def jaccard(a, b) -> float:
+    a, b = set(a), set(b)
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+def key_similarity(key_a: str, key_b: str) -> float:
+    """0 when the identities differ, otherwise trigram Jaccard of the keys."""
+    if key_a == key_b:
+        return 1.0
+    if name_identity(key_a) != name_identity(key_b):
+        return 0.0
+    return jaccard(name_ngrams(key_a), name_ngrams(key_b))
+
+
+def name_similarity(name_a: str, name_b: str, ignore_network: bool = True) -> float:
+    return key_similarity(name_key(name_a, ignore_network), name_key(name_b, ignore_network))
+
+
+# =====================================================
+# INDEXED MATCHER
+# =====================================================
+class PhoneMatcher:
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, ignore_network: bool = True):
+        self.threshold = threshold
+        self.ignore_network = ignore_network
+        self.keys = []                       # entry id -> key
+        self._by_key = {}                    # key -> entry id
+        self._postings = defaultdict(lambda: defaultdict(list))   # identity -> trigram -> entry ids
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, phone_name: str) -> int:
+        key = name_key(phone_name, self.ignore_network)
+        if key in self._by_key:
+            return self._by_key[key]
+
+        entry_id = len(self.keys)
+        self.keys.append(key)
+        self._by_key[key] = entry_id
+        postings = self._postings[name_identity(key)]
+        for gram in name_ngrams(key):
+            postings[gram].append(entry_id)
+        return entry_id
+
+    def match(self, phone_name: str):
+        """(entry id, score) of the best entry above the threshold, or None."""
+        key = name_key(phone_name, self.ignore_network)
+        if key in self._by_key:
+            return self._by_key[key], 1.0
+
+        postings = self._postings.get(name_identity(key))
+        if not postings:
+            return None
+
+        shared = Counter()
+        for gram in name_ngrams(key):
+            shared.update(postings.get(gram, ()))
+
+        best = None
+        for entry_id, _ in shared.most_common(MAX_CANDIDATES):
+            score = key_similarity(key, self.keys[entry_id])
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (entry_id, score)
+        return best
+
+    def add_or_match(self, phone_name: str) -> int:
+        found = self.match(phone_name)
+        return found[0] if found else self.add(phone_name)
+
+
+def consolidate_phones(phones: list, threshold: float = DEFAULT_THRESHOLD) -> list:
+    """
+    Merge extracted phones that name the same handset: descriptions are joined
+    (without repeating text) and a missing price_range is filled from a duplicate.
+    Order of first appearance is kept.
+    """
+    matcher = PhoneMatcher(threshold)
+    consolidated = {}
+
+    for phone in phones:
+        phone_name = (phone.get("phone_name") or "").strip()
+        if not phone_name:
+            continue
+
+        description = (phone.get("description") or "").strip()
+        entry_id = matcher.add_or_match(phone_name)
+
+        existing = consolidated.get(entry_id)
+        if existing is None:
+            consolidated[entry_id] = {
+                "phone_name": phone_name,
+                "description": description,
+                "price_range": phone.get("price_range"),
+            }
+            continue
+
+        if description and description not in existing["description"]:
+            existing["description"] = f"{existing['description']} {description}".strip()
+        if existing["price_range"] is None:
+            existing["price_range"] = phone.get("price_range")
+
+    return list(consolidated.values())
+
+
+# =====================================================
+# LISTING TITLE PRE-FILTER
+# =====================================================
+def _compact_tokens(tokens) -> list:
+    # "40i" -> "40 i", "s23ultra" -> "s 23 ultra": sellers drop or add spaces freely
+    return [part for t in tokens for part in re.findall(r"[a-z]+|\d+", t)]
+
+
+def title_matches_model(title: str, model: str, brand: str = "") -> bool:
+    """
+    Cheap check that a listing title may be about `model`. Only clear
+    mismatches are rejected, everything else goes to the LLM:
+    - the title names another brand and not this one ("Realme 12" for "OnePlus 12"),
+    - the model number / series run is missing ("Pixel 7" for "Pixel 6A"),
+    - every occurrence of the run is followed by a variant the target does not
+      have ("iPhone 13 Pro" for "iPhone 13").
+    Missing brand words and spacing ("S23ultra pta", "hot 40 i") are fine.
+    """
+    target_brand = name_brand(model, brand)
+    title_brands = {
+        BRAND_TOKENS.get(t) or SERIES_BRANDS.get(t)
+        for t in name_tokens(title)
+        if (t in BRAND_TOKENS or t in SERIES_BRANDS) and t not in AMBIGUOUS_BRAND_WORDS
+    }
+    if target_brand and title_brands and target_brand not in title_brands:
+        return False
+
+    target = [t for t in name_key(model).split() if t not in BRANDS]
+    identity_run = _compact_tokens(t for t in target if _is_identity_token(t) or t in VARIANT_TOKENS)
+    if not identity_run:
+        return True
+
+    tokens = _compact_tokens(t for t in name_tokens(title) if t not in NETWORK_TOKENS)
+    size = len(identity_run)
+    for i in range(len(tokens) - size + 1):
+        if tokens[i:i + size] != identity_run:
+            continue
+        following = tokens[i + size] if i + size < len(tokens) else None
+        if following in VARIANT_TOKENS:
+            continue
+        return True
+
+    return False
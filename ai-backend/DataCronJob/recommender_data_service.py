@@ -2,13 +2,20 @@
 
 import re
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptFound
 from deep_translator import GoogleTranslator
 from datetime import datetime
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
 from langchain_google_genai import ChatGoogleGenerativeAI
 import os
 from dotenv import load_dotenv
+from phone_catalogue import ensure_catalogue_indexes, merge_phones
+from phone_matcher import consolidate_phones
+from transcript_chunker import chunk_characters, chunk_token_budget, chunk_transcript, estimate_tokens
 
 load_dotenv()
 
@@ -17,33 +24,158 @@ client = MongoClient(os.getenv("MONGO_CONNECTION_STRING"))
 db = client["MobileDB"]                         
 videos_collection = db["videos"]
 phones_collection = db["phones"]
+pipeline_state_collection = db["pipeline_state"]
+catalogue_collection = db["phone_catalogue"]
+transcript_cache_collection = db["transcript_cache"]
 
 
 # Expire documents 60 days after created_at
 phones_collection.create_index("created_at", expireAfterSeconds=60 * 24 * 60 * 60)
+ensure_catalogue_indexes(catalogue_collection)
+transcript_cache_collection.create_index("video_id")
 
 
-translator = GoogleTranslator()
+# GoogleTranslator keeps the text/languages of the current request on the
+# instance, so translation workers each need their own
+_translator_local = threading.local()
+
+
+def get_translator():
+    if not hasattr(_translator_local, "translator"):
+        _translator_local.translator = GoogleTranslator()
+    return _translator_local.translator
+
+
+# --- LLM EXTRACTION SETTINGS ---
+# Chunks of one long transcript are extracted concurrently, bounded by a worker
+# pool and a minimum spacing between request starts (shared by all threads)
+LLM_MODEL = os.getenv("TRANSCRIPT_LLM_MODEL", "gemini-2.5-flash")
+LLM_WORKERS = int(os.getenv("TRANSCRIPT_LLM_WORKERS", 4))
+LLM_MIN_INTERVAL_SECONDS = float(os.getenv("TRANSCRIPT_LLM_MIN_INTERVAL", 0.5))
+TRANSLATION_WORKERS = int(os.getenv("TRANSLATION_WORKERS", 4))
+
+_llm = None
+_llm_lock = threading.Lock()
+_rate_lock = threading.Lock()
+_next_llm_call = 0.0
+
+
+def get_llm():
+    """One ChatGoogleGenerativeAI client per process (it is thread-safe)."""
+    global _llm
+    if _llm is None:
+        with _llm_lock:
+            if _llm is None:
+                _llm = ChatGoogleGenerativeAI(
+                    model=LLM_MODEL,
+                    google_api_key=os.getenv("GOOGLE_API_KEY"),
+                    temperature=0.1
+                )
+    return _llm
+
+
+def llm_rate_limit():
+    """Block until this thread may start an LLM request."""
+    global _next_llm_call
+    with _rate_lock:
+        now = time.monotonic()
+        wait = _next_llm_call - now
+        _next_llm_call = max(now, _next_llm_call) + LLM_MIN_INTERVAL_SECONDS
+    if wait > 0:
+        time.sleep(wait)
 
 
 
 def chunk_text(text, max_len=5000):
-    """Split text into chunks of max_len chars."""
-    return [text[i:i+max_len] for i in range(0, len(text), max_len)]
+    """Split text into chunks of at most max_len chars, on caption entry / sentence boundaries."""
+    return chunk_characters(text, max_len)
+
+def translate_text(text, source_language):
+    """
+    Translate to English. The translator takes at most 5000 characters per
+    request, so caption entries are packed into full-size requests that are
+    sent concurrently. Returns (text, number of chunks left untranslated).
+    """
+    chunks = chunk_text(text)
+
+    def translate_chunk(chunk):
+        try:
+            return get_translator().translate(chunk, src=source_language, dest='en'), False
+        except Exception as e:
+            print(f"Translation error for chunk: {e}")
+            return chunk, True
+
+    workers = max(1, min(TRANSLATION_WORKERS, len(chunks)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(translate_chunk, chunks))
+
+    return "\n".join(t for t, _ in results), sum(failed for _, failed in results)
+
+
+def _cache_transcript(video_id, language, transcript_data):
+    doc = {
+        "_id": f"{video_id}:{language}",
+        "video_id": video_id,
+        "language": language,
+        "is_english": language == 'en',
+        "entries": transcript_data,
+        # One caption entry per line so chunking can split on entry boundaries
+        "text": "\n".join([entry['text'] for entry in transcript_data]),
+        "translations": {},
+        "fetched_at": datetime.utcnow()
+    }
+    try:
+        transcript_cache_collection.replace_one({"_id": doc["_id"]}, doc, upsert=True)
+    except Exception as e:
+        print(f"Error caching transcript for {video_id}: {e}")
+    return doc
+
+
+def _english_text(doc):
+    """(English text, original language) for a cached transcript, translating once if needed."""
+    language = doc["language"]
+    if language == 'en':
+        return doc["text"], language
+
+    translated = doc.get("translations", {}).get("en")
+    if translated:
+        return translated, language
+
+    print(f"Translating from {language} to English")
+    translated, failed = translate_text(doc["text"], language)
+
+    # Partial translations are not cached so a later run retries them
+    if not failed:
+        try:
+            transcript_cache_collection.update_one(
+                {"_id": doc["_id"]},
+                {"$set": {"translations.en": translated}}
+            )
+        except Exception as e:
+            print(f"Error caching translation for {doc['video_id']}: {e}")
+
+    return translated, language
+
 
 def fetch_transcript(video_id):
     """
     Fetch transcript for a YouTube video.
     First tries English, then any available language with translation.
+    Raw entries and translations are cached per (video, language), so
+    reprocessing a video makes no transcript or translation calls.
     """
+    cached = transcript_cache_collection.find_one({"video_id": video_id}, sort=[("is_english", -1)])
+    if cached:
+        print(f"Using cached {cached['language']} transcript for {video_id}")
+        return _english_text(cached)
+
     try:
         ytt_api = YouTubeTranscriptApi()
 
         transcript = ytt_api.fetch(video_id, languages=['en'])
 
         transcript_data = transcript.to_raw_data()
-        text = " ".join([entry['text'] for entry in transcript_data])
-        return text, 'en'
+        return _english_text(_cache_transcript(video_id, 'en', transcript_data))
     
     except (TranscriptsDisabled, NoTranscriptFound):
         print(f"No English transcript found for {video_id}")
@@ -56,26 +188,9 @@ def fetch_transcript(video_id):
                 try:
                     fetched_transcript = transcript.fetch()
                     transcript_data = fetched_transcript.to_raw_data()
-                    text = " ".join([entry['text'] for entry in transcript_data])
-                    
-                    # If it's not English, translate it
-                    if transcript.language_code != 'en':
-                        print(f"Translating from {transcript.language_code} to English")
-                        # Translate in chunks to avoid API limits
-                        chunks = chunk_text(text)
-                        translated_chunks = []
-                        
-                        for chunk in chunks:
-                            try:
-                                translated = translator.translate(chunk, src=transcript.language_code, dest='en')
-                                translated_chunks.append(translated)
-                            except Exception as e:
-                                print(f"Translation error for chunk: {e}")
-                                translated_chunks.append(chunk)  
-                        
-                        text = " ".join(translated_chunks)
                     
-                    return text, transcript.language_code
+                    # Translated to English (once) if needed
+                    return _english_text(_cache_transcript(video_id, transcript.language_code, transcript_data))
                     
                 except Exception as e:
                     print(f"Error fetching transcript in {transcript.language_code}: {e}")
@@ -97,14 +212,15 @@ def fetch_transcript(video_id):
 def segment_transcript(transcript, video_title):
     """
     Use LLM to segment transcript and extract phone information.
-    Processes the full transcript by chunking if necessary.
+    Processes the full transcript in one call when it fits the model's context,
+    otherwise in token-sized chunks split on caption entry / sentence boundaries.
     """
-    max_context_length = 12000 
+    max_chunk_tokens = chunk_token_budget(LLM_MODEL)
     
-    if len(transcript) <= max_context_length:
+    if estimate_tokens(transcript) <= max_chunk_tokens:
         return _process_single_transcript(transcript, video_title)
     else:
-        return _process_chunked_transcript(transcript, video_title, max_context_length)
+        return _process_chunked_transcript(transcript, video_title, max_chunk_tokens)
 
 
 
@@ -135,35 +251,20 @@ def _process_single_transcript(transcript, video_title):
     {transcript}
     """
 
-    return _call_llm_and_parse(prompt)
+    return consolidate_phones(_call_llm_and_parse(prompt))
 
-def _process_chunked_transcript(transcript, video_title, max_length):
+def _process_chunked_transcript(transcript, video_title, max_tokens):
     """
-    Process transcript in overlapping chunks to ensure no phones are missed.
+    Process transcript in chunks of at most max_tokens, overlapping by a few
+    caption entries so no phone is cut off at a chunk edge.
     """
-    chunk_size = max_length - 1000  
-    overlap = 500 
-    
-    chunks = []
-    start = 0
-    
-    while start < len(transcript):
-        end = min(start + chunk_size, len(transcript))
-        chunk = transcript[start:end]
-        chunks.append(chunk)
-        
-        if end >= len(transcript):
-            break
-        start = end - overlap
+    chunks = chunk_transcript(transcript, max_tokens)
     
     print(f"Processing transcript in {len(chunks)} chunks...")
     
-    all_phones = []
-    phone_names_seen = set() 
+    prompts = []
     
     for i, chunk in enumerate(chunks):
-        print(f"Processing chunk {i+1}/{len(chunks)}")
-        
         prompt = f"""
         You are analyzing part {i+1} of {len(chunks)} from a YouTube transcript titled "{video_title}".
         This transcript reviews multiple phones.
@@ -190,17 +291,18 @@ def _process_chunked_transcript(transcript, video_title, max_length):
         {chunk}
         """
         
-        chunk_phones = _call_llm_and_parse(prompt)
-        
-        # Add phones that haven't been seen before
-        for phone in chunk_phones:
-            phone_name = phone.get('phone_name', '').strip()
-            if phone_name and phone_name not in phone_names_seen:
-                phone_names_seen.add(phone_name)
-                all_phones.append(phone)
+        prompts.append(prompt)
+    
+    # Extract all chunks concurrently; map() keeps results in chunk order
+    workers = max(1, min(LLM_WORKERS, len(prompts)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        chunk_results = list(executor.map(_call_llm_and_parse, prompts))
+    
+    # Overlapping chunks repeat phones; consolidation below merges them
+    all_phones = [phone for chunk_phones in chunk_results for phone in chunk_phones]
     
     # Final consolidation pass - merge similar phone names and combine descriptions
-    consolidated_phones = _consolidate_duplicate_phones(all_phones)
+    consolidated_phones = consolidate_phones(all_phones)
     
     print(f"Found {len(consolidated_phones)} unique phones after processing all chunks")
     return consolidated_phones
@@ -237,75 +339,15 @@ def infer_price_range_from_title(title: str):
 
 
 
-def _consolidate_duplicate_phones(phones):
-    """
-    Consolidate phones with similar names and merge their descriptions.
-    Also handles price_range consolidation.
-    """
-    if not phones:
-        return []
-    
-    consolidated = {}
-    
-    for phone in phones:
-        phone_name = phone.get('phone_name', '').strip()
-        description = phone.get('description', '').strip()
-        price_range = phone.get('price_range')
-        
-        if not phone_name:
-            continue
-            
-        # Simple similarity check - could be enhanced with fuzzy matching
-        found_match = False
-        for existing_name in consolidated.keys():
-            # Check if phone names are similar (basic approach)
-            if _are_phone_names_similar(phone_name, existing_name):
-                # Merge descriptions
-                existing_desc = consolidated[existing_name]['description']
-                if description not in existing_desc:  # Avoid duplicate content
-                    consolidated[existing_name]['description'] = f"{existing_desc} {description}".strip()
-                
-                # Update price_range if current one is null but new one has value
-                if consolidated[existing_name]['price_range'] is None and price_range is not None:
-                    consolidated[existing_name]['price_range'] = price_range
-                
-                found_match = True
-                break
-        
-        if not found_match:
-            consolidated[phone_name] = {
-                'phone_name': phone_name,
-                'description': description,
-                'price_range': price_range
-            }
-    
-    return list(consolidated.values())
-
-def _are_phone_names_similar(name1, name2):
-    """
-    Simple similarity check for phone names.
-    Could be enhanced with more sophisticated matching.
-    """
-    name1_clean = name1.lower().replace(' ', '')
-    name2_clean = name2.lower().replace(' ', '')
-    
-    # Check if one name contains the other (for cases like "iPhone 15" vs "iPhone 15 Pro")
-    return name1_clean in name2_clean or name2_clean in name1_clean
-
 def _call_llm_and_parse(prompt):
     """
     Call the LLM with the given prompt and parse the JSON response.
     """
     try:
-        # Initialize the LLM
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            google_api_key=os.getenv("GOOGLE_API_KEY"),
-            temperature=0.1
-        )
+        llm_rate_limit()
         
         # Generate response
-        response = llm.invoke(prompt)
+        response = get_llm().invoke(prompt)
         
         # Extract content from response
         content = response.content if hasattr(response, 'content') else str(response)
@@ -357,10 +399,40 @@ def _call_llm_and_parse(prompt):
         print(f"Error calling LLM: {e}")
         return []
 
+def _write_counts(result):
+    """Aggregate counts from a BulkWriteResult (or BulkWriteError.details)."""
+    if result is None:
+        return {"inserted": 0, "upserted": 0, "matched": 0, "modified": 0, "errors": 0}
+    details = result if isinstance(result, dict) else result.bulk_api_result
+    return {
+        "inserted": details.get("nInserted", 0),
+        "upserted": details.get("nUpserted", 0),
+        "matched": details.get("nMatched", 0),
+        "modified": details.get("nModified", 0),
+        "errors": len(details.get("writeErrors", [])),
+    }
+
+
+def _bulk_write(collection, operations, label):
+    """One unordered bulk_write; failures of single operations do not stop the rest."""
+    try:
+        counts = _write_counts(collection.bulk_write(operations, ordered=False) if operations else None)
+    except BulkWriteError as e:
+        counts = _write_counts(e.details)
+        print(f"Error storing {label}: {counts['errors']} failed writes, first: {e.details['writeErrors'][0].get('errmsg')}")
+    except Exception as e:
+        print(f"Error storing {label}: {e}")
+        counts = _write_counts(None)
+        counts["errors"] = len(operations)
+    return counts
+
+
 def process_video(video_id, title, url, price_range=None, uploaded_at=None):
     """
     Process a YouTube video: extract transcript, segment into phones, store in MongoDB.
     Automatically infers price range if not provided.
+    Returns the price_range values of the stored phones, plus the old ones of
+    catalogue entities the merge re-priced (None when skipped).
     """
     print(f"Processing video: {title}")
 
@@ -401,30 +473,57 @@ def process_video(video_id, title, url, price_range=None, uploaded_at=None):
     except Exception as e:
         print(f"Error storing video metadata: {e}")
 
-    # Store phones
+    # Store phones (one bulk write per collection)
     if phone_data and isinstance(phone_data, list):
-        for entry in phone_data:
-            phone_doc = {
-                "video_id": video_id,
-                "phone_name": entry.get("phone_name", "Unknown"),
-                "description": entry.get("description", ""),
-                "price_range": entry.get("price_range"),
-                "video_price_range": price_range,  # 🔹 consistent
-                "created_at": datetime.utcnow()
-            }
-
-            try:
-                phones_collection.update_one(
-                    {"video_id": video_id, "phone_name": phone_doc["phone_name"]},
-                    {"$set": phone_doc},
-                    upsert=True
-                )
-            except Exception as e:
-                print(f"Error storing phone data: {e}")
+        now = datetime.utcnow()
+        phone_docs = [{
+            "video_id": video_id,
+            "phone_name": entry.get("phone_name", "Unknown"),
+            "description": entry.get("description", ""),
+            "price_range": entry.get("price_range"),
+            "video_price_range": price_range,  # 🔹 consistent
+            "created_at": now
+        } for entry in phone_data]
+
+        phone_counts = _bulk_write(phones_collection, [
+            UpdateOne(
+                {"video_id": video_id, "phone_name": doc["phone_name"]},
+                {"$set": doc},
+                upsert=True
+            )
+            for doc in phone_docs
+        ], "phone data")
+
+        # One canonical entity per handset across all videos; entities the merge
+        # re-prices also leave their old budget's views
+        repriced = set()
+        try:
+            catalogue_counts = _write_counts(merge_phones(catalogue_collection, video_id, phone_docs, repriced))
+        except BulkWriteError as e:
+            catalogue_counts = _write_counts(e.details)
+            print(f"Error merging phones into catalogue: {catalogue_counts['errors']} failed writes")
+        except Exception as e:
+            print(f"Error merging phones into catalogue: {e}")
+            catalogue_counts = _write_counts(None)
+
+        print(f"✅ Stored {len(phone_data)} phones from video {title} "
+              f"(phones: {phone_counts}, catalogue: {catalogue_counts})")
+        stored_price_ranges = {entry.get("price_range") for entry in phone_data} | repriced
 
-        print(f"✅ Stored {len(phone_data)} phones from video {title}")
+        # Stamp the refresh so the API drops cached recommendations
+        try:
+            pipeline_state_collection.update_one(
+                {"_id": "phones"},
+                {"$set": {"refreshed_at": datetime.utcnow()}},
+                upsert=True
+            )
+        except Exception as e:
+            print(f"Error updating phones refresh stamp: {e}")
+
+        return sorted(p for p in stored_price_ranges if p is not None)
     else:
         print("⚠️ No valid phone data extracted from transcript")
+        return []
 
 
 # # Example usage
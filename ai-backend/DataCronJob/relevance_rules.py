@@ -0,0 +1,51 @@
+# relevance_rules.py
+#
+# Local first tier of the watcher's relevance classifier: keyword/regex rules
+# that decide the obvious titles without an LLM. A video is relevant when it is
+# a list-style recommendation of 4+ phones (see the LLM instruction in
+# youtube_watcher_service). Rules only answer when the signals agree; titles
+# with both accept and reject signals, or neither, go to the batched LLM call.
+
+import re
+
+# Accepting needs the plural: "best gaming phone" is usually a single-phone video
+_PHONES = r"(phones|mobiles|smartphones|devices)"
+_ANY_PHONES = r"(phones?|mobiles?|smartphones?|devices?)"
+_FEW = r"(2|3|two|three)"
+_MANY = r"([4-9]|1\d|20|four|five|six|seven|eight|nine|ten)"
+
+ACCEPT_PATTERNS = [
+    rf"\btop\s*{_MANY}\b",
+    rf"\b{_MANY}\s+(best\s+)?{_PHONES}\b",
+    rf"\bbest\s+(\w+\s+){{0,3}}{_PHONES}\b",
+    r"\b(my\s+)?(top\s+picks|choices|recommendations)\b",
+    rf"\b{_PHONES}\s+(under|below|upto|up\s+to)\s*(rs\.?\s*)?\d+\s*k?\b",
+    rf"\b\d+\s*k?\s*(to|-)\s*\d+\s*k\b.*\b{_PHONES}\b",
+    r"\bbuying\s+guide\b",
+]
+
+REJECT_PATTERNS = [
+    r"\bvs\.?\b|\bversus\b",
+    rf"\btop\s*{_FEW}\b",
+    rf"\b{_FEW}\s+(best\s+)?{_ANY_PHONES}\b",
+    r"\bunboxing\b|\bhands[\s-]+on\b|\bfirst\s+look\b|\bfirst\s+impressions?\b",
+    r"\bleaks?\b|\brumou?rs?\b|\blaunch(ed|ing)?\b|\bnews\b|\bteaser\b",
+    r"\bhow\s+to\b|\btips\b|\btricks\b|\bsoftware\s+update\b|\bgiveaway\b",
+    r"\breview\b(?!s)",
+]
+
+_ACCEPT = [re.compile(p, re.I) for p in ACCEPT_PATTERNS]
+_REJECT = [re.compile(p, re.I) for p in REJECT_PATTERNS]
+
+
+def rule_decision(title: str):
+    """True / False when the title alone is conclusive, None when the LLM should decide."""
+    text = title or ""
+    accept = any(p.search(text) for p in _ACCEPT)
+    reject = any(p.search(text) for p in _REJECT)
+
+    if accept and not reject:
+        return True
+    if reject and not accept:
+        return False
+    return None
@@ -0,0 +1,138 @@
+# spec_sheet_service.py
+#
+# Fills `new_mobiles`, the NewMobile spec sheets read by the offline spec
+# ranker (/recommend/ranked/), for the handsets in `phone_catalogue`.
+#
+# The catalogue only knows a phone's name, review notes and price bucket, so
+# the LLM is asked for the published spec sheet of the named model (using the
+# review notes as hints). The price is the catalogue's own price_range (Rs),
+# not an LLM guess. Sheets are keyed by the catalogue entity id; a sheet is
+# built once per handset and only its price follows the catalogue afterwards.
+# Sheets of entities that left the catalogue (TTL, rebuild) are removed.
+
+import json
+import re
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+from models import NewMobile
+from recommender_data_service import catalogue_collection, db, get_llm, llm_rate_limit
+
+specs_collection = db["new_mobiles"]
+
+# Entities filled per run (one LLM call each)
+MAX_SHEETS_PER_RUN = 50
+
+SPEC_FIELDS = [f for f in NewMobile.model_fields if f not in ("brand", "model", "price")]
+
+# ```json ... ``` around the answer, despite the prompt
+_CODE_FENCE = re.compile(r"^```[a-zA-Z]*\s*(.*?)\s*```$", re.S)
+
+
+def build_spec_prompt(entity: dict) -> str:
+    return f"""
+Return the official specification sheet of this phone as ONE JSON object.
+
+Phone: {entity["phone_name"]}
+Review notes (may mention some specs): {entity.get("description", "")}
+
+Keys: "brand", "model", {", ".join(f'"{f}"' for f in SPEC_FIELDS)}.
+- All values are short strings as on a spec sheet (e.g. "8GB", "256GB", "6.7 inches", "1080 x 2400, 120Hz",
+  "5000 mAh", "50 MP + 8 MP + 2 MP", "Snapdragon 7s Gen 2", "5G"), except release_year which is an integer.
+- Put the display refresh rate in screen_resolution when known.
+- Use null for anything you are not sure about. Do not guess a price.
+- Return ONLY the JSON object, no markdown.
+"""
+
+
+def parse_spec_sheet(content: str, entity: dict):
+    """NewMobile from the LLM answer, priced from the catalogue; None when unusable."""
+    content = content.strip()
+    fenced = _CODE_FENCE.match(content)
+    if fenced:
+        content = fenced.group(1)
+
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(data, dict):
+        return None
+
+    data = {k: v for k, v in data.items() if k in NewMobile.model_fields and k != "price"}
+    for key, value in data.items():
+        if value is not None and key != "release_year":
+            data[key] = str(value)
+    if not isinstance(data.get("release_year"), int):
+        data["release_year"] = None
+
+    data["model"] = data.get("model") or entity["phone_name"]
+    data["price"] = str(entity["price_range"])
+
+    try:
+        return NewMobile(**data)
+    except Exception:
+        return None
+
+
+def fill_spec_sheets(limit: int = MAX_SHEETS_PER_RUN) -> int:
+    """
+    Build spec sheets for priced catalogue entities that lack one (newest first),
+    re-price existing sheets whose catalogue price_range moved and delete sheets
+    whose entity is no longer in the catalogue. Returns the number of sheets written.
+    """
+    # Only sheets built here (catalogue_id) follow the catalogue
+    prices = {
+        doc["_id"]: doc.get("price")
+        for doc in specs_collection.find({"catalogue_id": {"$exists": True}}, {"price": 1})
+    }
+
+    catalogue_ids, missing, repriced = set(), [], []
+    for entity in catalogue_collection.find(
+        {}, {"phone_name": 1, "description": 1, "price_range": 1}
+    ).sort("updated_at", -1):
+        catalogue_ids.add(entity["_id"])
+        if entity.get("price_range") is None:
+            continue
+        if entity["_id"] not in prices:
+            if len(missing) < limit:
+                missing.append(entity)
+        elif prices[entity["_id"]] != str(entity["price_range"]):
+            repriced.append(UpdateOne({"_id": entity["_id"]}, {"$set": {"price": str(entity["price_range"])}}))
+
+    if repriced:
+        specs_collection.bulk_write(repriced, ordered=False)
+
+    expired = [sheet_id for sheet_id in prices if sheet_id not in catalogue_ids]
+    if expired:
+        specs_collection.delete_many({"_id": {"$in": expired}})
+
+    written = 0
+    for entity in missing:
+        try:
+            llm_rate_limit()
+            response = get_llm().invoke(build_spec_prompt(entity))
+            content = response.content if hasattr(response, "content") else str(response)
+        except Exception as e:
+            print(f"❌ Spec sheet LLM error for {entity['phone_name']}: {e}")
+            continue
+
+        sheet = parse_spec_sheet(content, entity)
+        if sheet is None:
+            print(f"⚠️ No usable spec sheet for {entity['phone_name']}")
+            continue
+
+        specs_collection.replace_one(
+            {"_id": entity["_id"]},
+            {**sheet.model_dump(), "catalogue_id": entity["_id"], "updated_at": datetime.utcnow()},
+            upsert=True
+        )
+        written += 1
+
+    print(f"📱 Spec sheets written: {written}, re-priced: {len(repriced)}, removed: {len(expired)}")
+    return written
+
+
+if __name__ == "__main__":
+    fill_spec_sheets(limit=10_000)
@@ -0,0 +1,130 @@
+# transcript_chunker.py
+#
+# Splits transcripts for LLM extraction and translation on natural boundaries.
+# fetch_transcript joins caption entries with newlines, so a unit is one
+# caption entry (timestamp boundary), further split at sentence ends when an
+# entry is long. Units are packed greedily up to a budget measured in model
+# tokens (or characters, for the translator), with a small overlap of whole
+# units between consecutive chunks.
+#
+# Gemini has no local tokenizer, so tokens are estimated from characters
+# (CHARS_PER_TOKEN); pass `count_tokens` (e.g. llm.get_num_tokens) for exact counts.
+
+import math
+import os
+import re
+
+# Input context window per model, in tokens
+MODEL_CONTEXT_TOKENS = {
+    "gemini-2.5-flash": 1_048_576,
+    "gemini-2.5-pro": 1_048_576,
+    "gemini-2.0-flash": 1_048_576,
+    "gemini-1.5-flash": 1_048_576,
+    "gpt-4o": 128_000,
+    "gpt-4o-mini": 128_000,
+}
+DEFAULT_CONTEXT_TOKENS = 32_000
+
+CHARS_PER_TOKEN = 4
+
+# Left free for the prompt instructions and the JSON answer
+PROMPT_OVERHEAD_TOKENS = 1_000
+OUTPUT_RESERVE_TOKENS = 8_192
+
+# Optional hard cap on chunk size (0 = as large as the model allows)
+MAX_CHUNK_TOKENS = int(os.getenv("TRANSCRIPT_MAX_CHUNK_TOKENS", 0))
+OVERLAP_TOKENS = int(os.getenv("TRANSCRIPT_CHUNK_OVERLAP_TOKENS", 150))
+
+_SENTENCE_END = re.compile(r"(?<=[.!?।])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+
+def chunk_token_budget(model_name: str) -> int:
+    """Largest transcript chunk (in tokens) one extraction prompt can hold."""
+    context = MODEL_CONTEXT_TOKENS.get(model_name, DEFAULT_CONTEXT_TOKENS)
+    budget = context - PROMPT_OVERHEAD_TOKENS - OUTPUT_RESERVE_TOKENS
+    if MAX_CHUNK_TOKENS > 0:
+        budget = min(budget, MAX_CHUNK_TOKENS)
+    return max(budget, 1)
+
+
+# =====================================================
+# UNITS
+# =====================================================
+def split_units(text: str, max_size: int, measure=len) -> list:
+    """Caption entries, then sentences; anything still above max_size is split on words."""
+    units = []
+    for line in (text or "").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if measure(line) <= max_size:
+            units.append(line)
+            continue
+
+        for sentence in _SENTENCE_END.split(line):
+            if measure(sentence) <= max_size:
+                units.append(sentence)
+                continue
+
+            words, current = sentence.split(), []
+            for word in words:
+                if current and measure(" ".join(current + [word])) > max_size:
+                    units.append(" ".join(current))
+                    current = []
+                current.append(word)
+            if current:
+                units.append(" ".join(current))
+
+    return units
+
+
+# =====================================================
+# PACKING
+# =====================================================
+def pack_units(units: list, max_size: int, overlap: int = 0, measure=len, separator: str = "\n") -> list:
+    """
+    Greedily pack units into chunks of at most max_size (per `measure`).
+    The last units of a chunk, up to `overlap`, are repeated at the start of the next.
+    """
+    chunks, current, size = [], [], 0
+    sep = measure(separator)
+
+    for unit in units:
+        unit_size = measure(unit)
+        if current and size + sep + unit_size > max_size:
+            chunks.append(separator.join(current))
+
+            carried, carried_size = [], 0
+            for previous in reversed(current):
+                previous_size = measure(previous)
+                if carried_size + previous_size + sep > overlap:
+                    break
+                carried.insert(0, previous)
+                carried_size += previous_size + sep
+
+            # Never let the overlap push the new chunk over budget
+            while carried and carried_size + unit_size > max_size:
+                carried_size -= measure(carried.pop(0)) + sep
+            current, size = carried, carried_size
+
+        current.append(unit)
+        size += unit_size + (sep if len(current) > 1 else 0)
+
+    if current:
+        chunks.append(separator.join(current))
+    return chunks
+
+
+def chunk_transcript(text: str, max_tokens: int, overlap_tokens: int = OVERLAP_TOKENS, count_tokens=estimate_tokens) -> list:
+    """Token-budgeted chunks aligned to caption entries / sentences."""
+    units = split_units(text, max_tokens, measure=count_tokens)
+    return pack_units(units, max_tokens, overlap_tokens, measure=count_tokens)
+
+
+def chunk_characters(text: str, max_chars: int) -> list:
+    """Character-budgeted chunks (translation APIs) aligned to entries / sentences, no overlap."""
+    return pack_units(split_units(text, max_chars), max_chars)
@@ -1,12 +1,22 @@
 # youtube_watcher_service.py
 from googleapiclient.discovery import build
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne
+import json
 import os
+import sys
+import threading
 import time
 import re
 from recommender_data_service import process_video
+from relevance_rules import rule_decision
+from spec_sheet_service import fill_spec_sheets
+
+# The API packages (RecommendationEngine, models) live one level up
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from RecommendationEngine.recommendation_service import refresh_recommendation_views
 
 # OpenAI imports
 from openai import OpenAI  
@@ -21,6 +31,20 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 if not (YOUTUBE_API_KEY and MONGO_URI and OPENAI_API_KEY):
     raise RuntimeError("Missing one of YOUTUBE_API_KEY, MONGO_CONNECTION_STRING, or OPENAI_API_KEY in env")
 
+# First run for a channel (no watermark yet) looks back this far
+INITIAL_LOOKBACK_DAYS = 30
+CHANNEL_WORKERS = int(os.getenv("YOUTUBE_CHANNEL_WORKERS", 4))
+
+# YouTube Data API: units this run may spend (playlistItems.list costs 1 per page,
+# search.list 100) and minimum spacing between requests across all threads
+YOUTUBE_QUOTA_BUDGET = int(os.getenv("YOUTUBE_QUOTA_BUDGET", 500))
+YOUTUBE_MIN_REQUEST_INTERVAL = float(os.getenv("YOUTUBE_MIN_REQUEST_INTERVAL", 0.2))
+PLAYLIST_PAGE_SIZE = 50
+
+# Ambiguous titles classified per OpenAI request
+RELEVANCE_BATCH_SIZE = int(os.getenv("RELEVANCE_BATCH_SIZE", 40))
+RELEVANCE_DESCRIPTION_CHARS = 300
+
 # --- CHANNELS TO MONITOR ---
 CHANNELS = {
     "Babloo Lahori": "UCUMnLDbOryIo-gwmrLFo2qA",
@@ -33,36 +57,116 @@ CHANNELS = {
 client = MongoClient(MONGO_URI)
 db = client["MobileDB"]
 videos_collection = db["videos"]
+channel_state_collection = db["channel_state"]
+# Relevance decisions (positive and negative) per video, so no video is classified twice
+relevance_collection = db["video_relevance"]
 
 # --- YOUTUBE SERVICE ---
-youtube = build("youtube", "v3", developerKey=YOUTUBE_API_KEY)
+# The discovery client (httplib2) is not thread-safe: one per worker thread
+_thread_local = threading.local()
+
+
+def youtube_client():
+    if not hasattr(_thread_local, "youtube"):
+        _thread_local.youtube = build("youtube", "v3", developerKey=YOUTUBE_API_KEY)
+    return _thread_local.youtube
+
+
+class QuotaLimiter:
+    """Shared by all channel workers: spaces requests and stops at the run's quota budget."""
+
+    def __init__(self, budget, min_interval):
+        self.budget = budget
+        self.min_interval = min_interval
+        self.used = 0
+        self._next_request = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, units=1):
+        """Reserve quota for one request; False when the budget is spent."""
+        with self._lock:
+            if self.used + units > self.budget:
+                return False
+            self.used += units
+            now = time.monotonic()
+            wait = self._next_request - now
+            self._next_request = max(now, self._next_request) + self.min_interval
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+
+quota_limiter = QuotaLimiter(YOUTUBE_QUOTA_BUDGET, YOUTUBE_MIN_REQUEST_INTERVAL)
 
 # --- OPENAI CLIENT SETUP ---
 openai_client = OpenAI(api_key=OPENAI_API_KEY)
 
-def fetch_new_videos(channel_id):
-    """Fetch latest videos from a channel in the last 7 days."""
-    published_after = (datetime.utcnow() - timedelta(days=30)).isoformat("T") + "Z"
-    request = youtube.search().list(
-        part="snippet",
-        channelId=channel_id,
-        order="date",
-        publishedAfter=published_after,
-        type="video",
-        maxResults=10
+def uploads_playlist_id(channel_id):
+    """Every channel's uploads playlist is its id with the UC prefix replaced by UU."""
+    return "UU" + channel_id[2:]
+
+
+def get_watermark(channel_id):
+    """publishedAt (RFC 3339) of the newest upload already seen for the channel."""
+    state = channel_state_collection.find_one({"_id": channel_id}, {"last_seen_published_at": 1})
+    if state and state.get("last_seen_published_at"):
+        return state["last_seen_published_at"]
+    return (datetime.utcnow() - timedelta(days=INITIAL_LOOKBACK_DAYS)).isoformat("T") + "Z"
+
+
+def set_watermark(channel_id, name, published_at):
+    channel_state_collection.update_one(
+        {"_id": channel_id},
+        {"$set": {"name": name, "last_seen_published_at": published_at, "updated_at": datetime.utcnow()}},
+        upsert=True
     )
-    response = request.execute()
-    return response.get("items", [])
 
-def llm_relevance_check(title: str, description: str = "") -> bool:
+
+def fetch_new_videos(channel_id, published_after):
     """
-    Use an OpenAI model to decide whether a video is a list/comparison video (multiple phones / price-range).
-    Returns True if relevant (YES), False otherwise (NO).
+    Uploads newer than published_after, newest first, read from the channel's
+    uploads playlist (1 quota unit per page instead of 100 for search).
+    Items are returned in the search().list shape used by the rest of the watcher.
+    Returns (videos, complete); complete is False when the quota budget ran out
+    before the watermark was reached, i.e. older new uploads were not fetched.
     """
-    # Compose the instruction/prompt succinctly and deterministically.
-    system_instruction = (
-        """You are a labeler that answers only YES or NO.
-Return exactly YES or NO (uppercase), nothing else.
+    videos = []
+    page_token = None
+
+    while True:
+        if not quota_limiter.acquire(1):
+            print(f"⚠️ YouTube quota budget for this run reached; stopping at {len(videos)} videos")
+            return videos, False
+
+        response = youtube_client().playlistItems().list(
+            part="snippet,contentDetails",
+            playlistId=uploads_playlist_id(channel_id),
+            maxResults=PLAYLIST_PAGE_SIZE,
+            pageToken=page_token
+        ).execute()
+
+        reached_watermark = False
+        for item in response.get("items", []):
+            snippet = item["snippet"]
+            published_at = item["contentDetails"].get("videoPublishedAt") or snippet.get("publishedAt")
+            if not published_at or published_at <= published_after:
+                reached_watermark = True
+                break
+            videos.append({
+                "id": {"videoId": item["contentDetails"]["videoId"]},
+                "snippet": {**snippet, "publishedAt": published_at}
+            })
+
+        page_token = response.get("nextPageToken")
+        if reached_watermark or not page_token:
+            break
+
+    return videos, True
+
+RELEVANCE_INSTRUCTION = """You are a labeler that classifies YouTube videos as YES or NO.
+You receive a numbered list of videos (title and description).
+Return ONLY a JSON object of the form {"results": [{"index": 1, "answer": "YES"}, ...]}
+with exactly one entry per video, answer being "YES" or "NO" (uppercase).
 
 Answer YES if the video is very likely a list-style recommendation video of smartphones, even if the title does not explicitly mention the number of phones. This includes:
 - Category-based lists (best camera phones, best gaming phones, best performance phones, best battery phones, etc.)
@@ -79,90 +183,280 @@ Answer NO if:
 
 If the title suggests a list but the number of phones is unclear, lean toward YES unless it explicitly states 2 or 3 phones.
 """
-    )
 
-    user_input = f"Title: {title}\n\nDescription: {description}"
 
-    try:
-        resp = openai_client.responses.create(
-            model="gpt-4o",          # adjust if you want another model
-            input=[
-                {"role": "system", "content": system_instruction},
-                {"role": "user", "content": user_input}
-            ],
-            max_output_tokens=20
+def _response_text(resp):
+    # The Responses API returns text in various places depending on version;
+    # prefer top-level output_text if present, else join output segments.
+    if hasattr(resp, "output_text") and resp.output_text:
+        return resp.output_text
+
+    segments = []
+    for item in getattr(resp, "output", []) or []:
+        # item may have 'content' list of dicts
+        for c in item.get("content", []):
+            if isinstance(c, dict) and c.get("type") == "output_text":
+                segments.append(c.get("text", ""))
+    return " ".join(segments)
+
+
+def llm_relevance_batch(videos):
+    """
+    Classify many videos with one OpenAI request per RELEVANCE_BATCH_SIZE videos.
+    `videos` is a list of (video_id, title, description); returns video_id -> bool.
+    Videos missing from the answer (or from a failed request) are left out.
+    """
+    decisions = {}
+
+    for start in range(0, len(videos), RELEVANCE_BATCH_SIZE):
+        batch = videos[start:start + RELEVANCE_BATCH_SIZE]
+        user_input = "\n\n".join(
+            f"{i}. Title: {title}\nDescription: {(description or '')[:RELEVANCE_DESCRIPTION_CHARS]}"
+            for i, (_, title, description) in enumerate(batch, 1)
         )
-        # The Responses API returns text in various places depending on version;
-        # prefer top-level output_text if present, else join output segments.
-        out_text = ""
-        if hasattr(resp, "output_text") and resp.output_text:
-            out_text = resp.output_text
-        else:
-            # fallback: try to join choices / content segments
-            segments = []
-            for item in getattr(resp, "output", []) or []:
-                # item may have 'content' list of dicts
-                for c in item.get("content", []):
-                    if isinstance(c, dict) and c.get("type") == "output_text":
-                        segments.append(c.get("text", ""))
-            out_text = " ".join(segments)
-
-        decision = out_text.strip().upper()
-        # Accept "YES" if it appears at start to be lenient with trailing punctuation/newlines
-        return decision.startswith("YES")
-    except Exception as e:
-        # In case of an LLM error, be conservative: treat as not relevant,
-        # and print the error for debugging. Up to you to change this behavior.
-        print(f"LLM check failed: {e}")
-        return False
 
-def run_youtube_monitor():
-    """Main watcher logic."""
-    for name, channel_id in CHANNELS.items():
-        videos = fetch_new_videos(channel_id)
-        print(f"🔎 Checking channel: {name} ({len(videos)} new videos)")
-        for video in videos:
-            vid_id = video["id"]["videoId"]
-            title = video["snippet"]["title"]
-            description = video["snippet"].get("description", "")
-            url = f"https://www.youtube.com/watch?v={vid_id}"
+        try:
+            resp = openai_client.responses.create(
+                model="gpt-4o",          # adjust if you want another model
+                input=[
+                    {"role": "system", "content": RELEVANCE_INSTRUCTION},
+                    {"role": "user", "content": user_input}
+                ],
+                text={"format": {"type": "json_object"}},
+                max_output_tokens=20 * len(batch) + 50
+            )
+            results = json.loads(_response_text(resp)).get("results", [])
+        except Exception as e:
+            # Not cached: these videos are retried on the next run
+            print(f"LLM relevance batch failed: {e}")
+            continue
 
-            # --- LLM semantic check ---
-            if not llm_relevance_check(title, description):
-                print(f"❌ Skipped (not list-type): {title}")
-                time.sleep(3)  # polite pause between LLM calls
+        for result in results:
+            try:
+                video_id = batch[int(result["index"]) - 1][0]
+            except (KeyError, ValueError, TypeError, IndexError):
                 continue
+            decisions[video_id] = str(result.get("answer", "")).strip().upper().startswith("YES")
+
+    return decisions
+
+
+def load_known_video_ids(video_ids):
+    """Which of these videos are already stored (watcher uses video_id, process_video youtube_id)."""
+    if not video_ids:
+        return set()
+    known = set()
+    for doc in videos_collection.find(
+        {"$or": [{"video_id": {"$in": video_ids}}, {"youtube_id": {"$in": video_ids}}]},
+        {"_id": 0, "video_id": 1, "youtube_id": 1}
+    ):
+        known.update(v for v in (doc.get("video_id"), doc.get("youtube_id")) if v)
+    return known
+
+
+def load_cached_relevance(video_ids):
+    """video_id -> cached relevance decision for these videos."""
+    if not video_ids:
+        return {}
+    return {
+        doc["_id"]: doc["relevant"]
+        for doc in relevance_collection.find({"_id": {"$in": video_ids}}, {"relevant": 1})
+    }
+
 
-            # --- Avoid duplicates ---
-            if videos_collection.find_one({"video_id": vid_id}):
+def save_relevance(decisions):
+    """Cache (video_id, title, relevant, source) decisions in one bulk write."""
+    if not decisions:
+        return
+    now = datetime.utcnow()
+    relevance_collection.bulk_write([
+        UpdateOne(
+            {"_id": video_id},
+            {"$set": {"relevant": relevant, "title": title, "source": source, "checked_at": now}},
+            upsert=True
+        )
+        for video_id, title, relevant, source in decisions
+    ], ordered=False)
+
+
+def collect_channel_videos(name, channel_id):
+    """New uploads of one channel (oldest first) with stored/cached-relevance flags."""
+    watermark = get_watermark(channel_id)
+    videos, complete = fetch_new_videos(channel_id, watermark)
+    print(f"🔎 Checking channel: {name} ({len(videos)} new videos)")
+
+    # --- Pre-filter: one $in query each for stored videos and cached decisions ---
+    video_ids = [video["id"]["videoId"] for video in videos]
+    known_ids = load_known_video_ids(video_ids)
+    cached_relevance = load_cached_relevance([v for v in video_ids if v not in known_ids])
+
+    return {
+        "name": name,
+        "channel_id": channel_id,
+        # Oldest first, so the watermark only moves past videos that were handled
+        "videos": list(reversed(videos)),
+        # False when the quota cut the fetch short: uploads older than these are missing
+        "complete": complete,
+        "known": known_ids,
+        "relevance": cached_relevance,
+    }
+
+
+def classify_videos(channel_batches):
+    """
+    Fill in relevance for every video that is neither stored nor cached:
+    local rules first, then one batched LLM call for the ambiguous rest of the run.
+    """
+    decisions, ambiguous, owner = [], [], {}
+
+    for batch in channel_batches:
+        for video in batch["videos"]:
+            vid_id = video["id"]["videoId"]
+            if vid_id in batch["known"] or vid_id in batch["relevance"]:
                 continue
 
-            print(f"📹 New relevant video found: {title}")
+            title = video["snippet"]["title"]
+            relevant = rule_decision(title)
+            if relevant is None:
+                ambiguous.append((vid_id, title, video["snippet"].get("description", "")))
+                owner[vid_id] = batch
+            else:
+                batch["relevance"][vid_id] = relevant
+                decisions.append((vid_id, title, relevant, "rules"))
 
-            videos_collection.insert_one({
-                "video_id": vid_id,
-                "title": title,
-                "url": url,
-                "channel": name,
-                "processed": False,
-                "timestamp": datetime.utcnow()
-            })
+    llm_decisions = llm_relevance_batch(ambiguous) if ambiguous else {}
+    titles = {vid_id: title for vid_id, title, _ in ambiguous}
+    for vid_id, relevant in llm_decisions.items():
+        owner[vid_id]["relevance"][vid_id] = relevant
+        decisions.append((vid_id, titles[vid_id], relevant, "llm"))
+
+    print(f"🧮 Relevance: {len(decisions) - len(llm_decisions)} decided by rules, "
+          f"{len(ambiguous)} sent to the LLM in {-(-len(ambiguous) // RELEVANCE_BATCH_SIZE)} request(s)")
+
+    try:
+        save_relevance(decisions)
+    except Exception as e:
+        print(f"Error caching relevance decisions: {e}")
+
+
+def process_channel_videos(batch):
+    """Ingest one channel's relevant new videos; returns the price_range values ingested."""
+    name, channel_id = batch["name"], batch["channel_id"]
+    refreshed_price_ranges = set()
+
+    # Videos left unclassified (failed LLM request, or missing from its answer)
+    # must be fetched again next run: the watermark stays just before the oldest
+    # of them. Newer videos that were handled are stored/cached, so re-fetching
+    # them costs no LLM call. When the quota cut the fetch short, uploads older
+    # than this batch were never fetched, so the watermark does not move at all.
+    unclassified = 0
+
+    def advance_watermark(video):
+        if batch["complete"] and not unclassified:
+            set_watermark(channel_id, name, video["snippet"]["publishedAt"])
 
-            # --- Extraction ---
+    for video in batch["videos"]:
+        vid_id = video["id"]["videoId"]
+        title = video["snippet"]["title"]
+        url = f"https://www.youtube.com/watch?v={vid_id}"
+
+        # --- Avoid duplicates ---
+        if vid_id in batch["known"]:
+            advance_watermark(video)
+            continue
+
+        if vid_id not in batch["relevance"]:
+            print(f"⏳ Not classified, retried next run: {title}")
+            unclassified += 1
+            continue
+
+        if not batch["relevance"][vid_id]:
+            print(f"❌ Skipped (not list-type): {title}")
+            advance_watermark(video)
+            continue
+
+        print(f"📹 New relevant video found: {title}")
+
+        videos_collection.insert_one({
+            "video_id": vid_id,
+            "title": title,
+            "url": url,
+            "channel": name,
+            "processed": False,
+            "timestamp": datetime.utcnow()
+        })
+
+        # --- Extraction ---
+        try:
+            print(f"🔍 Extracting phone data from {title} ...")
+            stored_price_ranges = process_video(
+                video_id=vid_id,
+                title=title,
+                url=url
+            )
+            refreshed_price_ranges.update(stored_price_ranges or [])
+            videos_collection.update_one({"video_id": vid_id}, {"$set": {"processed": True}})
+            print("✅ Extraction complete!")
+        except Exception as e:
+            print(f"❌ Error extracting data from {title}: {e}")
+
+        advance_watermark(video)
+
+    if not batch["complete"]:
+        print(f"⏳ {name}: watermark held, older uploads were not fetched (quota)")
+    elif unclassified:
+        print(f"⏳ {name}: watermark held before {unclassified} unclassified video(s)")
+
+    return refreshed_price_ranges
+
+
+def run_youtube_monitor():
+    """Main watcher logic: channels are monitored concurrently."""
+    # price_range values of every phone ingested in this run
+    refreshed_price_ranges = set()
+
+    workers = max(1, min(CHANNEL_WORKERS, len(CHANNELS)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # 1. Fetch new uploads of all channels concurrently
+        futures = {
+            executor.submit(collect_channel_videos, name, channel_id): name
+            for name, channel_id in CHANNELS.items()
+        }
+        channel_batches = []
+        for future, name in futures.items():
+            try:
+                channel_batches.append(future.result())
+            except Exception as e:
+                print(f"❌ Error fetching channel {name}: {e}")
+
+        # 2. Classify everything new in this run at once
+        classify_videos(channel_batches)
+
+        # 3. Ingest relevant videos, channels concurrently
+        futures = {
+            executor.submit(process_channel_videos, batch): batch["name"]
+            for batch in channel_batches
+        }
+        for future, name in futures.items():
             try:
-                print(f"🔍 Extracting phone data from {title} ...")
-                process_video(
-                    video_id=vid_id,
-                    title=title,
-                    url=url
-                )
-                videos_collection.update_one({"video_id": vid_id}, {"$set": {"processed": True}})
-                print("✅ Extraction complete!")
+                refreshed_price_ranges.update(future.result())
             except Exception as e:
-                print(f"❌ Error extracting data from {title}: {e}")
+                print(f"❌ Error monitoring channel {name}: {e}")
+
+    print(f"📊 YouTube quota used this run: {quota_limiter.used}/{quota_limiter.budget} units")
+
+    # Spec sheets for the offline ranker, for handsets that do not have one yet
+    try:
+        fill_spec_sheets()
+    except Exception as e:
+        print(f"❌ Error filling spec sheets: {e}")
 
-            # Wait between video processing to avoid hitting API quota
-            time.sleep(5)
+    # Precompute recommendations for the budgets the new phones fall into
+    if refreshed_price_ranges:
+        try:
+            refresh_recommendation_views(refreshed_price_ranges)
+        except Exception as e:
+            print(f"❌ Error materializing recommendation views: {e}")
 
 if __name__ == "__main__":
     run_youtube_monitor()
@@ -0,0 +1,238 @@
+# market_snapshot.py
+#
+# Export / import of the market data collections to partitioned Parquet files,
+# so pricing can be trained and benchmarked offline and deterministically.
+#
+#   python DataSnapshot/market_snapshot.py export snapshots/2025-01-01
+#   python DataSnapshot/market_snapshot.py import snapshots/2025-01-01
+
+import argparse
+import json
+import os
+from datetime import datetime, timezone
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from bson import ObjectId
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+load_dotenv()
+
+MONGO_URI = os.getenv("MONGO_CONNECTION_STRING")
+DB_NAME = "MobileDB"
+
+MANIFEST_FILE = "manifest.json"
+
+
+# =====================================================
+# SNAPSHOT LAYOUT
+# =====================================================
+# Explicit schemas keep files stable across exports even when
+# some Mongo documents are missing fields or use mixed types.
+USED_MOBILES_SCHEMA = pa.schema([
+    ("_id", pa.string()),
+    ("link", pa.string()),
+    ("brand", pa.string()),
+    ("model", pa.string()),
+    ("ram", pa.string()),
+    ("storage", pa.string()),
+    ("condition", pa.int64()),
+    ("condition_score", pa.float64()),
+    ("pta_approved", pa.bool_()),
+    ("is_panel_changed", pa.bool_()),
+    ("screen_crack", pa.bool_()),
+    ("panel_dot", pa.bool_()),
+    ("panel_line", pa.bool_()),
+    ("panel_shade", pa.bool_()),
+    ("camera_lens_ok", pa.bool_()),
+    ("fingerprint_ok", pa.bool_()),
+    ("with_box", pa.bool_()),
+    ("with_charger", pa.bool_()),
+    ("price", pa.int64()),
+    ("city", pa.string()),
+    ("listing_source", pa.string()),
+    ("images", pa.list_(pa.string())),
+    ("post_date", pa.string()),
+    ("extraction_date", pa.timestamp("us", tz="UTC")),
+])
+
+PHONES_SCHEMA = pa.schema([
+    ("_id", pa.string()),
+    ("video_id", pa.string()),
+    ("phone_name", pa.string()),
+    ("description", pa.string()),
+    ("price_range", pa.int64()),
+    ("video_price_range", pa.string()),
+    ("created_at", pa.timestamp("us", tz="UTC")),
+])
+
+# collection -> (schema, partition column, sort key)
+SNAPSHOT_COLLECTIONS = {
+    "used_mobiles": (USED_MOBILES_SCHEMA, "brand", "link"),
+    "phones": (PHONES_SCHEMA, "price_range", "_id"),
+}
+
+
+def _coerce(value, field_type):
+    """Coerce a raw Mongo value to the snapshot column type (None when impossible)."""
+    if value is None:
+        return None
+
+    try:
+        if pa.types.is_string(field_type):
+            return str(value)
+        if pa.types.is_int64(field_type):
+            return int(value)
+        if pa.types.is_float64(field_type):
+            return float(value)
+        if pa.types.is_boolean(field_type):
+            return bool(value)
+        if pa.types.is_list(field_type):
+            if isinstance(value, str):
+                return [v.strip() for v in value.split(",") if v.strip()]
+            return [str(v) for v in value]
+        if pa.types.is_timestamp(field_type):
+            if isinstance(value, datetime) and value.tzinfo is None:
+                return value.replace(tzinfo=timezone.utc)
+            return value if isinstance(value, datetime) else None
+    except (TypeError, ValueError):
+        return None
+
+    return value
+
+
+def _documents_to_table(docs, schema: pa.Schema, sort_key: str) -> pa.Table:
+    columns = {field.name: [] for field in schema}
+
+    for doc in sorted(docs, key=lambda d: str(d.get(sort_key, ""))):
+        for field in schema:
+            columns[field.name].append(_coerce(doc.get(field.name), field.type))
+
+    return pa.table(columns, schema=schema)
+
+
+# =====================================================
+# EXPORT (MONGO -> PARQUET)
+# =====================================================
+def export_snapshot(snapshot_dir: str, mongo_uri: str = MONGO_URI, collections=None) -> dict:
+    """
+    Write each collection to <snapshot_dir>/<collection>/ as a hive-partitioned
+    Parquet dataset plus a manifest with row counts and the export time.
+    """
+    client = MongoClient(mongo_uri)
+    db = client[DB_NAME]
+
+    manifest = {
+        "exported_at": datetime.now(timezone.utc).isoformat(),
+        "collections": {}
+    }
+
+    for name in collections or SNAPSHOT_COLLECTIONS:
+        schema, partition_col, sort_key = SNAPSHOT_COLLECTIONS[name]
+        projection = {field.name: 1 for field in schema}
+
+        table = _documents_to_table(db[name].find({}, projection), schema, sort_key)
+
+        ds.write_dataset(
+            table,
+            os.path.join(snapshot_dir, name),
+            format="parquet",
+            partitioning=ds.partitioning(
+                pa.schema([schema.field(partition_col)]), flavor="hive"
+            ),
+            existing_data_behavior="delete_matching",
+        )
+
+        manifest["collections"][name] = {
+            "rows": table.num_rows,
+            "partitioned_by": partition_col
+        }
+        print(f"✅ Exported {table.num_rows} documents from {name}")
+
+    os.makedirs(snapshot_dir, exist_ok=True)
+    with open(os.path.join(snapshot_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+# =====================================================
+# READ (PARQUET -> ARROW / DICTS)
+# =====================================================
+def read_collection(snapshot_dir: str, name: str, columns=None, filters=None) -> pa.Table:
+    """
+    Read a snapshotted collection with column pruning and memory-mapped IO.
+    `filters` uses the pyarrow DNF filter syntax and prunes whole partitions.
+    """
+    schema, partition_col, _ = SNAPSHOT_COLLECTIONS[name]
+
+    return pq.read_table(
+        os.path.join(snapshot_dir, name),
+        columns=columns,
+        filters=filters,
+        memory_map=True,
+        partitioning=ds.partitioning(
+            pa.schema([schema.field(partition_col)]), flavor="hive"
+        ),
+    )
+
+
+def read_used_mobiles(snapshot_dir: str, input_model: str, columns=None) -> list:
+    """
+    Snapshot equivalent of the Atlas query used for training:
+    case-insensitive substring match on `model`.
+    """
+    if columns is not None and "model" not in columns:
+        columns = list(columns) + ["model"]
+
+    table = read_collection(snapshot_dir, "used_mobiles", columns=columns)
+    mask = pc.match_substring(table["model"], input_model, ignore_case=True)
+    return table.filter(pc.fill_null(mask, False)).to_pylist()
+
+
+# =====================================================
+# IMPORT (PARQUET -> MONGO)
+# =====================================================
+def import_snapshot(snapshot_dir: str, mongo_uri: str = MONGO_URI, collections=None, batch_size: int = 1000) -> dict:
+    """Replace the target collections with the snapshot contents."""
+    client = MongoClient(mongo_uri)
+    db = client[DB_NAME]
+    counts = {}
+
+    for name in collections or SNAPSHOT_COLLECTIONS:
+        table = read_collection(snapshot_dir, name)
+        db[name].delete_many({})
+
+        inserted = 0
+        for batch in table.to_batches(max_chunksize=batch_size):
+            docs = batch.to_pylist()
+            for doc in docs:
+                # Restore the original ObjectIds; Mongo assigns fresh ones when missing
+                if ObjectId.is_valid(doc.get("_id") or ""):
+                    doc["_id"] = ObjectId(doc["_id"])
+                else:
+                    doc.pop("_id", None)
+            if docs:
+                db[name].insert_many(docs, ordered=False)
+                inserted += len(docs)
+
+        counts[name] = inserted
+        print(f"✅ Imported {inserted} documents into {name}")
+
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Snapshot market data to/from Parquet")
+    parser.add_argument("action", choices=["export", "import"])
+    parser.add_argument("snapshot_dir")
+    parser.add_argument("--collections", nargs="*", choices=list(SNAPSHOT_COLLECTIONS))
+    args = parser.parse_args()
+
+    if args.action == "export":
+        export_snapshot(args.snapshot_dir, collections=args.collections)
+    else:
+        import_snapshot(args.snapshot_dir, collections=args.collections)
@@ -0,0 +1,77 @@
+# model_store.py
+#
+# Persistence for trained pricing artifacts (model + market uncertainty +
+# optional price lookup table), keyed by phone model. Artifacts live on disk
+# so they survive restarts and are shared by workers, with a small in-process
+# cache in front.
+
+import os
+import re
+import threading
+import time
+
+import joblib
+from cachetools import TTLCache
+
+MODEL_STORE_DIR = os.getenv("PRICE_MODEL_DIR", "model_artifacts")
+MODEL_MAX_AGE_HOURS = float(os.getenv("PRICE_MODEL_MAX_AGE_HOURS", 24))
+MODEL_MEMORY_CACHE_SIZE = int(os.getenv("PRICE_MODEL_CACHE_SIZE", 32))
+
+_memory_cache = TTLCache(maxsize=MODEL_MEMORY_CACHE_SIZE, ttl=MODEL_MAX_AGE_HOURS * 3600)
+_lock = threading.Lock()
+
+
+def artifact_key(input_model: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", (input_model or "").strip().lower()).strip("_")
+
+
+def artifact_path(input_model: str) -> str:
+    return os.path.join(MODEL_STORE_DIR, f"{artifact_key(input_model)}.joblib")
+
+
+def save_artifact(input_model: str, artifact: dict) -> str:
+    """Write atomically so concurrent workers never read a half-written file."""
+    os.makedirs(MODEL_STORE_DIR, exist_ok=True)
+    path = artifact_path(input_model)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+
+    artifact = {**artifact, "trained_at": time.time()}
+    joblib.dump(artifact, tmp_path)
+    os.replace(tmp_path, path)
+
+    with _lock:
+        _memory_cache[artifact_key(input_model)] = artifact
+
+    return path
+
+
+def _is_fresh(artifact: dict) -> bool:
+    return time.time() - artifact.get("trained_at", 0) <= MODEL_MAX_AGE_HOURS * 3600
+
+
+def load_artifact(input_model: str):
+    """Fresh artifact for the model, or None when missing or older than MODEL_MAX_AGE_HOURS."""
+    key = artifact_key(input_model)
+
+    with _lock:
+        artifact = _memory_cache.get(key)
+    if artifact is not None and _is_fresh(artifact):
+        return artifact
+
+    path = artifact_path(input_model)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        artifact = joblib.load(path)
+    except Exception as e:
+        print(f"Failed to load model artifact {path}: {e}")
+        return None
+
+    if not _is_fresh(artifact):
+        return None
+
+    with _lock:
+        _memory_cache[key] = artifact
+
+    return artifact
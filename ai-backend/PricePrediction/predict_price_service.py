@@ -1,6 +1,7 @@
-from typing import List
+from typing import Iterable, List
 from pymongo.collection import Collection
-from sklearn.ensemble import RandomForestRegressor
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+import numpy as np
 import pandas as pd
 import re
 import os
@@ -10,6 +11,9 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from models import UsedMobile
+from PricePrediction.training_executor import training_executor
+from PricePrediction.price_lookup_table import DEFAULT_TOLERANCE, PriceLookupTable
+from PricePrediction.model_store import load_artifact, save_artifact
 
 # =====================================================
 # DB SETUP
@@ -45,14 +49,69 @@ def derive_condition_score(mobile: UsedMobile) -> float | None:
     return max(0, min(20, score))
 
 
+def with_condition_score(mobile: UsedMobile) -> UsedMobile | None:
+    """The mobile with condition_score filled from its condition when missing; None if neither is known."""
+    if mobile.condition_score is not None:
+        return mobile
+    score = derive_condition_score(mobile)
+    if score is None:
+        return None
+    return mobile.model_copy(update={"condition_score": score})
+
+
+# =====================================================
+# TRAINING DATA SOURCES
+# =====================================================
+# Only the columns the model trains on are read (column pruning)
+TRAINING_FIELDS = [
+    f for f in UsedMobile.model_fields
+    if f not in ("images", "post_date", "listing_source", "city")
+]
+
+
+class MongoDataSource:
+    """Live market data from Atlas."""
+
+    def __init__(self, db: Collection = collection):
+        self.db = db
+
+    def load_records(self, input_model: str) -> Iterable[dict]:
+        query = {"model": {"$regex": re.escape(input_model), "$options": "i"}}
+        return self.db.find(query, {f: 1 for f in TRAINING_FIELDS})
+
+
+class ParquetDataSource:
+    """Offline market data from a Parquet snapshot (see DataSnapshot/market_snapshot.py)."""
+
+    def __init__(self, snapshot_dir: str):
+        self.snapshot_dir = snapshot_dir
+
+    def load_records(self, input_model: str) -> Iterable[dict]:
+        from DataSnapshot.market_snapshot import read_used_mobiles
+        return read_used_mobiles(self.snapshot_dir, input_model, columns=TRAINING_FIELDS)
+
+
+def default_data_source():
+    snapshot_dir = os.getenv("PRICE_DATA_SNAPSHOT")
+    if snapshot_dir:
+        return ParquetDataSource(snapshot_dir)
+    return MongoDataSource(collection)
+
+
 # =====================================================
 # FETCH TRAINING DATA
 # =====================================================
-def fetch_training_data(input_model: str, db: Collection = collection) -> List[UsedMobile]:
-    query = {"model": {"$regex": re.escape(input_model), "$options": "i"}}
+def fetch_training_data(input_model: str, db=None) -> List[UsedMobile]:
+    """`db` may be a Mongo collection or any data source with `load_records`."""
+    if db is None:
+        source = default_data_source()
+    elif hasattr(db, "load_records"):
+        source = db
+    else:
+        source = MongoDataSource(db)
 
     mobiles = []
-    for doc in db.find(query):
+    for doc in source.load_records(input_model):
         try:
             if "images" in doc and isinstance(doc["images"], str):
                 doc["images"] = [i.strip() for i in doc["images"].split(",") if i.strip()]
@@ -126,20 +185,44 @@ def preprocess_training_data(training_data: List[UsedMobile]) -> pd.DataFrame:
 # =====================================================
 # TRAIN MODEL
 # =====================================================
-def train_model(training_df: pd.DataFrame) -> RandomForestRegressor:
+# Candidate regressors, compared by Benchmarks/pricing_benchmark.py
+MODEL_FAMILIES = {
+    "random_forest": lambda: RandomForestRegressor(
+        n_estimators=120, max_depth=18, random_state=42
+    ),
+    "random_forest_60": lambda: RandomForestRegressor(
+        n_estimators=60, max_depth=14, random_state=42
+    ),
+    "random_forest_30": lambda: RandomForestRegressor(
+        n_estimators=30, max_depth=12, random_state=42
+    ),
+    "hist_gradient_boosting": lambda: HistGradientBoostingRegressor(
+        max_iter=200, learning_rate=0.1, random_state=42
+    ),
+    # ~1/7 of the 120-tree forest's size, but the least accurate family on the
+    # synthetic benchmark (MAPE 6.90% vs 6.52% for random_forest)
+    "compact_forest": lambda: RandomForestRegressor(
+        n_estimators=60, max_depth=12, min_samples_leaf=3, random_state=42
+    ),
+}
+
+DEFAULT_MODEL_FAMILY = os.getenv("PRICE_MODEL_FAMILY", "random_forest")
+
+
+def to_model_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Trees split on float32 internally; converting once avoids a float64 copy per fit/predict."""
+    return df.astype(np.float32)
+
+
+def train_model(training_df: pd.DataFrame, family: str = DEFAULT_MODEL_FAMILY):
     df = training_df.dropna(subset=["price", "condition_score"])
 
-    X = df.drop(columns=["price"])
+    X = to_model_features(df.drop(columns=["price"]))
     y = df["price"]
 
-    model = RandomForestRegressor(
-        n_estimators=120,
-        max_depth=18,
-        random_state=42
-    )
+    model = MODEL_FAMILIES[family]()
 
-    model.fit(X, y)
-    return model
+    return training_executor.fit(model, X, y)
 
 
 # =====================================================
@@ -174,46 +257,54 @@ def compute_dynamic_price_range(base_price: float, uncertainty: float):
 
 
 # =====================================================
-# PRICE PREDICTION
+# PRICE MULTIPLIERS (CONDITION + VERIFICATION PENALTIES)
 # =====================================================
-def predict_price_range(model, input_df, training_df, mobile, ai_flags):
-    df = input_df.copy()
-    df.drop(columns=["model", "brand"], inplace=True, errors="ignore")
+def compute_price_multipliers(mobiles: List[UsedMobile], ai_flags_list: List[dict]) -> np.ndarray:
+    """
+    Vectorized form of the condition and penalty rules, one multiplier per mobile.
+    Missing flags follow the same truthiness as the single-phone path.
+    """
+    def flag(values):
+        return np.array([bool(v) for v in values], dtype=bool)
 
-    # Base ML prediction
-    base_price = model.predict(df)[0]
-
-    # Condition score influence
-    base_price *= (0.7 + 0.015 * mobile.condition_score)
+    condition_score = np.array([m.condition_score for m in mobiles], dtype=float)
+    multiplier = 0.7 + 0.015 * condition_score
 
     # AI-based verification penalties
-    if mobile.screen_crack and not ai_flags.get("screen_crack", False):
-        base_price *= 0.7
-
-    if mobile.panel_dot and not ai_flags.get("panel_dot", False):
-        base_price *= 0.75
-
-    if mobile.panel_line and not ai_flags.get("panel_line", False):
-        base_price *= 0.7
+    for field, factor in (("screen_crack", 0.7), ("panel_dot", 0.75), ("panel_line", 0.7)):
+        claimed = flag(getattr(m, field) for m in mobiles)
+        detected = flag(flags.get(field, False) for flags in ai_flags_list)
+        multiplier *= np.where(claimed & ~detected, factor, 1.0)
 
     # AI cannot detect these reliably
-    if mobile.panel_shade:
-        base_price *= 0.75
+    multiplier *= np.where(flag(m.panel_shade for m in mobiles), 0.75, 1.0)
+    multiplier *= np.where(flag(m.is_panel_changed for m in mobiles), 0.8, 1.0)
+    multiplier *= np.where(~flag(m.camera_lens_ok for m in mobiles), 0.9, 1.0)
+    multiplier *= np.where(~flag(m.fingerprint_ok for m in mobiles), 0.85, 1.0)
+    multiplier *= np.where(~flag(m.pta_approved for m in mobiles), 0.8, 1.0)
 
-    if mobile.is_panel_changed:
-        base_price *= 0.8
+    return multiplier
 
-    if not mobile.camera_lens_ok:
-        base_price *= 0.9
 
-    if not mobile.fingerprint_ok:
-        base_price *= 0.85
+# =====================================================
+# PRICE PREDICTION
+# =====================================================
+def predict_price_range(model, input_df, training_df, mobile, ai_flags,
+                        lookup_table=None, uncertainty=None):
+    df = input_df.copy()
+    df.drop(columns=["model", "brand"], inplace=True, errors="ignore")
+
+    # Base ML prediction (precomputed grid when the request falls on it)
+    base_price = lookup_table.lookup(df) if lookup_table is not None else None
+    if base_price is None:
+        base_price = model.predict(to_model_features(df))[0]
 
-    if not mobile.pta_approved:
-        base_price *= 0.8
+    # Condition score influence + AI-based verification penalties
+    base_price *= compute_price_multipliers([mobile], [ai_flags])[0]
 
     # Market-driven price range 
-    uncertainty = compute_market_uncertainty(training_df)
+    if uncertainty is None:
+        uncertainty = compute_market_uncertainty(training_df)
     min_price, max_price = compute_dynamic_price_range(base_price, uncertainty)
 
     return {
@@ -222,14 +313,82 @@ def predict_price_range(model, input_df, training_df, mobile, ai_flags):
     }
 
 
+def predict_price_ranges(model, input_df, training_df, mobiles, ai_flags_list, uncertainty=None):
+    """Predict a whole group of phones of the same model with one model.predict call."""
+    df = input_df.drop(columns=["model", "brand"], errors="ignore")
+
+    base_prices = model.predict(to_model_features(df)) * compute_price_multipliers(mobiles, ai_flags_list)
+
+    if uncertainty is None:
+        uncertainty = compute_market_uncertainty(training_df)
+    delta = base_prices * uncertainty
+    min_prices = np.round((base_prices - delta) / 500) * 500
+    max_prices = np.round((base_prices + delta) / 500) * 500
+
+    return [
+        {"min_price": int(lo), "max_price": int(hi)}
+        for lo, hi in zip(min_prices, max_prices)
+    ]
+
+
 
 # =====================================================
-# FINAL PIPELINE
+# PRECOMPUTATION MODE (PERSISTED MODEL + LOOKUP TABLE)
 # =====================================================
-def run_pipeline(input_mobile: UsedMobile, ai_flags: dict, db: Collection = collection):
-    training_data = fetch_training_data(input_mobile.model, db)
+PRECOMPUTE_PRICE_TABLES = os.getenv("PRICE_PRECOMPUTE_TABLES", "0") == "1"
+PRICE_TABLE_TOLERANCE = float(os.getenv("PRICE_TABLE_TOLERANCE", DEFAULT_TOLERANCE))
+
+
+def build_price_lookup_table(model, training_df: pd.DataFrame):
+    """Grid of base predictions, kept only if it agrees with model.predict within tolerance."""
+    try:
+        table = PriceLookupTable.build(model, training_df)
+    except Exception as e:
+        print(f"Price lookup table build failed: {e}")
+        return None
+
+    if not table.validate(model, tolerance=PRICE_TABLE_TOLERANCE):
+        print(f"Price lookup table rejected (max relative error {table.max_relative_error:.4f})")
+        return None
+
+    return table
+
+
+def get_pricing_artifact(input_model: str, db=None) -> dict:
+    """Trained model, market uncertainty and lookup table for a phone model, reused until stale."""
+    artifact = load_artifact(input_model)
+    if artifact is not None:
+        return artifact
+
+    training_df = preprocess_training_data(fetch_training_data(input_model, db))
+    model = train_model(training_df)
+
+    artifact = {
+        "model": model,
+        "family": DEFAULT_MODEL_FAMILY,
+        "uncertainty": compute_market_uncertainty(training_df),
+        "n_training_rows": len(training_df),
+        "lookup_table": build_price_lookup_table(model, training_df),
+    }
+    save_artifact(input_model, artifact)
+
+    return artifact
+
 
+# =====================================================
+# FINAL PIPELINE
+# =====================================================
+def run_pipeline(input_mobile: UsedMobile, ai_flags: dict, db=None):
     input_df = preprocess_input_mobile(input_mobile)
+
+    if PRECOMPUTE_PRICE_TABLES:
+        artifact = get_pricing_artifact(input_mobile.model, db)
+        return predict_price_range(
+            artifact["model"], input_df, None, input_mobile, ai_flags,
+            lookup_table=artifact["lookup_table"], uncertainty=artifact["uncertainty"]
+        )
+
+    training_data = fetch_training_data(input_mobile.model, db)
     training_df = preprocess_training_data(training_data)
 
     model = train_model(training_df)
@@ -238,6 +397,65 @@ def run_pipeline(input_mobile: UsedMobile, ai_flags: dict, db: Collection = coll
 
 
 
+# =====================================================
+# BATCH PIPELINE (ONE TRAINING PER DISTINCT MODEL)
+# =====================================================
+def run_batch_pipeline(items: List[tuple], db=None) -> List[dict]:
+    """
+    items: list of (UsedMobile, ai_flags) pairs.
+    Phones are grouped by model so each model is fetched and trained once,
+    and every group is priced with a single vectorized prediction.
+    Results keep the input order; a failed group reports an error per phone.
+    Phones without a condition score (or a condition to derive it from) get an
+    error of their own instead of failing their whole group.
+    """
+    results = [None] * len(items)
+    scored = {}
+
+    groups = {}
+    for idx, (mobile, _) in enumerate(items):
+        scored[idx] = with_condition_score(mobile)
+        if scored[idx] is None:
+            results[idx] = {"error": "condition_score is required."}
+            continue
+        key = (mobile.model or "").strip().lower()
+        groups.setdefault(key, []).append(idx)
+
+    for key, indices in groups.items():
+        mobiles = [scored[i] for i in indices]
+        ai_flags_list = [items[i][1] or {} for i in indices]
+
+        try:
+            if not key:
+                raise ValueError("Phone model is required.")
+
+            input_df = pd.concat(
+                [preprocess_input_mobile(m) for m in mobiles],
+                ignore_index=True
+            )
+
+            if PRECOMPUTE_PRICE_TABLES:
+                artifact = get_pricing_artifact(mobiles[0].model, db)
+                group_results = predict_price_ranges(
+                    artifact["model"], input_df, None, mobiles, ai_flags_list,
+                    uncertainty=artifact["uncertainty"]
+                )
+            else:
+                training_data = fetch_training_data(mobiles[0].model, db)
+                training_df = preprocess_training_data(training_data)
+                model = train_model(training_df)
+                group_results = predict_price_ranges(model, input_df, training_df, mobiles, ai_flags_list)
+
+        except Exception as e:
+            group_results = [{"error": str(e)}] * len(indices)
+
+        for i, result in zip(indices, group_results):
+            results[i] = result
+
+    return results
+
+
+
 
 ai_flags = {
     "screen_crack": False,
@@ -0,0 +1,196 @@
+# price_lookup_table.py
+#
+# Precomputed model predictions over the feature grid most pricing requests
+# fall on: ram x storage x condition-score buckets x boolean condition flags.
+# Lookups take microseconds instead of a full forest traversal per request.
+#
+# For tree ensembles the condition-score axis is cut at the model's own split
+# thresholds, so the prediction is constant inside each bucket and the lookup
+# is exact. Other models use evenly spaced buckets with linear interpolation.
+
+import numpy as np
+import pandas as pd
+
+# Flags that vary between requests; encoded as bits of the last table axis
+GRID_FLAGS = [
+    "pta_approved",
+    "is_panel_changed",
+    "screen_crack",
+    "panel_dot",
+    "panel_line",
+    "panel_shade",
+    "camera_lens_ok",
+    "fingerprint_ok",
+]
+
+CONDITION_SCORE_BUCKETS = np.arange(0.0, 20.0 + 1e-9, 0.5, dtype=np.float32)
+
+# Above this many split-threshold buckets, fall back to interpolated buckets
+MAX_STEP_BUCKETS = 256
+
+DEFAULT_TOLERANCE = 0.03
+
+
+class PriceLookupTable:
+    def __init__(self, feature_names, ram_values, storage_values, condition_scores,
+                 fixed_features: dict, table: np.ndarray, thresholds=None):
+        self.feature_names = list(feature_names)
+        self.ram_values = np.asarray(ram_values, dtype=np.float32)
+        self.storage_values = np.asarray(storage_values, dtype=np.float32)
+        # Interpolation mode: bucket centres. Step mode: one representative per bucket
+        self.condition_scores = np.asarray(condition_scores, dtype=np.float32)
+        # Step mode only: sorted split thresholds separating the buckets
+        self.thresholds = None if thresholds is None else np.asarray(thresholds, dtype=np.float64)
+        # Non-grid features and the value a request must have for the table to apply (NaN = missing)
+        self.fixed_features = fixed_features
+        self.table = table
+        self.max_relative_error = None
+
+    # =====================================================
+    # BUILD
+    # =====================================================
+    @staticmethod
+    def _split_thresholds(model, feature_index: int):
+        """Distinct thresholds the ensemble splits `feature_index` on, or None if not a tree ensemble."""
+        estimators = getattr(model, "estimators_", None)
+        if estimators is None:
+            return None
+
+        thresholds = []
+        for estimator in np.ravel(estimators):
+            tree = getattr(estimator, "tree_", None)
+            if tree is None:
+                return None
+            thresholds.append(tree.threshold[tree.feature == feature_index])
+
+        return np.unique(np.concatenate(thresholds)) if thresholds else None
+
+    @classmethod
+    def build(cls, model, training_df: pd.DataFrame, condition_scores=CONDITION_SCORE_BUCKETS):
+        feature_names = list(model.feature_names_in_)
+
+        thresholds = cls._split_thresholds(model, feature_names.index("condition_score"))
+        if thresholds is not None and len(thresholds) < MAX_STEP_BUCKETS:
+            # One point strictly inside each interval between consecutive thresholds
+            edges = np.concatenate([[-1.0], thresholds, [21.0]]) if len(thresholds) else np.array([-1.0, 21.0])
+            condition_scores = (edges[:-1] + edges[1:]) / 2
+        else:
+            thresholds = None
+
+        ram_values = np.unique(training_df["ram"].dropna().to_numpy(dtype=np.float32))
+        storage_values = np.unique(training_df["storage"].dropna().to_numpy(dtype=np.float32))
+
+        # Everything else is pinned to "not provided", which is what the pricing endpoints send
+        fixed_features = {
+            name: np.nan for name in feature_names
+            if name not in GRID_FLAGS and name not in ("ram", "storage", "condition_score")
+        }
+
+        n_flags = len(GRID_FLAGS)
+        flag_codes = np.arange(2 ** n_flags)
+        flag_bits = (flag_codes[:, None] >> np.arange(n_flags)) & 1
+
+        ram_idx, storage_idx, cond_idx, code_idx = np.meshgrid(
+            np.arange(len(ram_values)),
+            np.arange(len(storage_values)),
+            np.arange(len(condition_scores)),
+            flag_codes,
+            indexing="ij",
+        )
+
+        grid = {
+            "ram": ram_values[ram_idx.ravel()],
+            "storage": storage_values[storage_idx.ravel()],
+            "condition_score": condition_scores[cond_idx.ravel()],
+        }
+        for bit, name in enumerate(GRID_FLAGS):
+            grid[name] = flag_bits[code_idx.ravel(), bit].astype(np.float32)
+        for name, value in fixed_features.items():
+            grid[name] = np.full(ram_idx.size, value, dtype=np.float32)
+
+        X = pd.DataFrame(grid)[feature_names]
+        table = model.predict(X).astype(np.float32).reshape(ram_idx.shape)
+
+        return cls(feature_names, ram_values, storage_values, condition_scores, fixed_features, table, thresholds)
+
+    # =====================================================
+    # LOOKUP
+    # =====================================================
+    def lookup(self, input_df: pd.DataFrame):
+        """
+        Base price for a single preprocessed input row, or None when the row
+        is outside the grid and must go through model.predict.
+        """
+        row = input_df.iloc[0]
+
+        try:
+            ram = float(row["ram"])
+            storage = float(row["storage"])
+            condition_score = float(row["condition_score"])
+        except (KeyError, TypeError, ValueError):
+            return None
+
+        for name, value in self.fixed_features.items():
+            actual = row.get(name)
+            if np.isnan(value):
+                if actual is not None and not pd.isna(actual):
+                    return None
+            elif actual != value:
+                return None
+
+        ram_hits = np.flatnonzero(self.ram_values == ram)
+        storage_hits = np.flatnonzero(self.storage_values == storage)
+        if not len(ram_hits) or not len(storage_hits):
+            return None
+
+        if self.thresholds is None and not (self.condition_scores[0] <= condition_score <= self.condition_scores[-1]):
+            return None
+
+        code = 0
+        for bit, name in enumerate(GRID_FLAGS):
+            value = row.get(name)
+            if value not in (0, 1, True, False):
+                return None
+            code |= int(value) << bit
+
+        curve = self.table[ram_hits[0], storage_hits[0], :, code]
+
+        if self.thresholds is not None:
+            # Trees compare the float32 feature against the threshold: x <= t goes left
+            bucket = np.searchsorted(self.thresholds, np.float32(condition_score), side="left")
+            return float(curve[bucket])
+
+        return float(np.interp(condition_score, self.condition_scores, curve))
+
+    # =====================================================
+    # VALIDATION
+    # =====================================================
+    def validate(self, model, samples: int = 300, tolerance: float = DEFAULT_TOLERANCE, seed: int = 42) -> bool:
+        """
+        Compare lookups against direct predictions at random (off-bucket)
+        points of the grid. Records the worst relative error.
+        """
+        rng = np.random.default_rng(seed)
+
+        rows = {
+            "ram": rng.choice(self.ram_values, samples),
+            "storage": rng.choice(self.storage_values, samples),
+            "condition_score": rng.uniform(0.0, 20.0, samples),
+        }
+        for name in GRID_FLAGS:
+            rows[name] = rng.integers(0, 2, samples).astype(np.float32)
+        for name, value in self.fixed_features.items():
+            rows[name] = np.full(samples, value, dtype=np.float32)
+
+        X = pd.DataFrame(rows)[self.feature_names].astype(np.float32)
+        direct = model.predict(X)
+        looked_up = np.array([self.lookup(X.iloc[[i]]) for i in range(samples)], dtype=float)
+
+        relative_error = np.abs(looked_up - direct) / np.maximum(np.abs(direct), 1.0)
+        self.max_relative_error = float(relative_error.max())
+
+        return self.max_relative_error <= tolerance
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.table.nbytes)
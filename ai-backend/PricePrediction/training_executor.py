@@ -0,0 +1,60 @@
+# training_executor.py
+#
+# Bounded-resource model fitting for the pricing service.
+# Each training job gets a fixed core budget (used for tree-parallel fitting),
+# and the number of jobs training at the same time in one worker is capped,
+# so a burst of pricing requests cannot oversubscribe the machine.
+
+import os
+import threading
+
+from threadpoolctl import threadpool_limits
+
+
+def _default_cores_per_job() -> int:
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+TRAINING_CORES_PER_JOB = int(os.getenv("PRICE_TRAINING_CORES", _default_cores_per_job()))
+MAX_CONCURRENT_TRAINING_JOBS = int(os.getenv("PRICE_TRAINING_MAX_JOBS", 2))
+
+
+class TrainingExecutor:
+    def __init__(self, cores_per_job: int = TRAINING_CORES_PER_JOB,
+                 max_concurrent_jobs: int = MAX_CONCURRENT_TRAINING_JOBS):
+        self.cores_per_job = max(1, cores_per_job)
+        self.max_concurrent_jobs = max(1, max_concurrent_jobs)
+        self._slots = threading.BoundedSemaphore(self.max_concurrent_jobs)
+        # OpenMP/BLAS pool sizes are process-global, so concurrent fits cannot each
+        # set and restore them: they are capped once, on the first fit (when the
+        # estimator's native libraries are loaded), for the executor's lifetime
+        self._thread_limits = None
+        self._limits_lock = threading.Lock()
+
+    def fit(self, model, X, y):
+        """
+        Fit `model` inside a training slot, blocking while all slots are busy.
+        Estimators with `n_jobs` use the core budget for parallel trees; OpenMP/BLAS
+        pools (e.g. histogram gradient boosting) are capped to the same budget
+        from the first fit on.
+        """
+        with self._limits_lock:
+            if self._thread_limits is None:
+                self._thread_limits = threadpool_limits(limits=self.cores_per_job)
+
+        with self._slots:
+            has_n_jobs = "n_jobs" in model.get_params()
+
+            if has_n_jobs:
+                model.set_params(n_jobs=self.cores_per_job)
+
+            model.fit(X, y)
+
+            # Request-path predictions are a handful of rows; thread fan-out only adds latency
+            if has_n_jobs:
+                model.set_params(n_jobs=1)
+
+        return model
+
+
+training_executor = TrainingExecutor()
@@ -0,0 +1,97 @@
+# candidate_ranker.py
+#
+# Local pre-ranking of recommendation candidates before the LLM call.
+# A TF-IDF index over phone_name + description is fitted once over the whole
+# phone catalogue and rebuilt only when the YouTube cron refreshes it.
+# Candidates in the price window are scored against the user's priority and
+# only the top-k reach the prompt, so prompt size stays constant as more
+# videos are ingested.
+
+import asyncio
+import os
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+TOP_K_CANDIDATES = int(os.getenv("RECOMMENDATION_TOP_K", 8))
+
+# Extra query terms per canonical priority (see recommendation_cache.PRIORITY_SYNONYMS)
+PRIORITY_EXPANSIONS = {
+    "gaming": "gaming games pubg fps smooth gpu processor chipset snapdragon dimensity cooling refresh rate performance",
+    "camera": "camera cameras photos photography selfie video recording megapixel mp ois night mode portrait",
+    "battery": "battery mah backup long lasting charging fast charging watt timing",
+    "performance": "performance processor chipset snapdragon dimensity fast smooth ram multitasking antutu",
+    "display": "display screen amoled oled refresh rate hz brightness bezels",
+    "value": "value money price budget paisa wasool overall all rounder affordable",
+}
+
+_NEVER_BUILT = object()
+
+
+def _document_text(phone: dict) -> str:
+    return f"{phone.get('phone_name', '')} {phone.get('description', '')}"
+
+
+class CandidateRanker:
+    def __init__(self, collection, top_k: int = TOP_K_CANDIDATES):
+        self.collection = collection
+        self.top_k = top_k
+        self._vectorizer = None
+        self._version = _NEVER_BUILT
+        self._lock = asyncio.Lock()
+
+    # =====================================================
+    # INDEX (REBUILT ON PHONES REFRESH)
+    # =====================================================
+    async def refresh(self, phones_version=None):
+        """Refit the TF-IDF vocabulary/idf on the whole collection if the data changed."""
+        if phones_version == self._version:
+            return
+
+        async with self._lock:
+            if phones_version == self._version:
+                return
+
+            docs = await self.collection.find({}, {"phone_name": 1, "description": 1}).to_list(length=None)
+            corpus = [_document_text(doc) for doc in docs]
+
+            # Fitting is CPU-bound; keep it off the event loop
+            self._vectorizer = await asyncio.to_thread(self._fit, corpus)
+            self._version = phones_version
+            print(f"🔄 Rebuilt recommendation candidate index over {len(corpus)} phones")
+
+    @staticmethod
+    def _fit(corpus: list):
+        if not corpus:
+            return None
+
+        vectorizer = TfidfVectorizer(
+            lowercase=True,
+            stop_words="english",
+            ngram_range=(1, 2),
+            sublinear_tf=True,
+        )
+        try:
+            return vectorizer.fit(corpus)
+        except ValueError:
+            # Empty vocabulary (e.g. only stop words)
+            return None
+
+    # =====================================================
+    # RANKING
+    # =====================================================
+    def rank(self, phones: list, priority: str, top_k: int = None) -> list:
+        """Top-k phones by cosine similarity between the (expanded) priority and each phone's text."""
+        top_k = top_k or self.top_k
+        if len(phones) <= top_k or self._vectorizer is None:
+            return phones[:top_k]
+
+        query = f"{priority} {PRIORITY_EXPANSIONS.get(priority, '')}"
+        query_vec = self._vectorizer.transform([query])
+        doc_vecs = self._vectorizer.transform([_document_text(p) for p in phones])
+
+        # TF-IDF rows are L2-normalised, so the dot product is the cosine similarity
+        scores = (doc_vecs @ query_vec.T).toarray().ravel()
+        order = np.argsort(-scores, kind="stable")[:top_k]
+
+        return [phones[i] for i in order]
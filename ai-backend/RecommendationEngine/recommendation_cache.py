@@ -0,0 +1,165 @@
+# recommendation_cache.py
+#
+# Response cache for /recommend/. Keys are a budget bucket aligned to the
+# 5000-step price_range values plus a normalized priority, so "Gaming",
+# "gaming performance" and "PUBG" under ~50k all share one entry.
+#
+# Tiers: bounded in-memory LRU with TTL, and an optional Mongo collection shared
+# by all workers. Both are invalidated when the YouTube cron refreshes `phones`
+# (it stamps pipeline_state._id="phones"); that stamp is re-read at most once
+# per REFRESH_CHECK_SECONDS, so cache hits normally do no Mongo I/O at all.
+#
+# `db` is an async (Motor) database; all Mongo access is awaited.
+
+import os
+import re
+import time
+from datetime import datetime
+
+from cachetools import TTLCache
+
+PRICE_BUCKET_STEP = 5000
+
+CACHE_TTL_SECONDS = int(os.getenv("RECOMMENDATION_CACHE_TTL", 6 * 60 * 60))
+CACHE_MAX_ENTRIES = int(os.getenv("RECOMMENDATION_CACHE_SIZE", 512))
+USE_MONGO_TIER = os.getenv("RECOMMENDATION_CACHE_MONGO", "0") == "1"
+REFRESH_CHECK_SECONDS = int(os.getenv("RECOMMENDATION_REFRESH_CHECK_SECONDS", 60))
+
+# canonical priority -> phrases users type for it
+PRIORITY_SYNONYMS = {
+    "gaming": ["gaming", "games", "game", "gamer", "pubg", "free fire", "freefire", "cod",
+               "gaming performance", "performance for gaming", "high fps"],
+    "camera": ["camera", "cameras", "photography", "photos", "photo", "pictures", "selfie",
+               "selfies", "video recording", "vlogging", "camera quality"],
+    "battery": ["battery", "battery life", "long battery", "battery timing", "backup",
+                "battery backup", "long lasting battery", "charging", "fast charging"],
+    "performance": ["performance", "speed", "fast", "processor", "chipset", "multitasking",
+                    "smooth", "overall performance"],
+    "display": ["display", "screen", "amoled", "refresh rate", "screen quality", "display quality"],
+    "value": ["value", "value for money", "paisa wasool", "budget", "cheap", "best value",
+              "all rounder", "allrounder", "overall", "general use", "daily use"],
+}
+
+_PHRASE_TO_PRIORITY = {
+    phrase: canonical
+    for canonical, phrases in PRIORITY_SYNONYMS.items()
+    for phrase in phrases
+}
+
+
+def _clean(text: str) -> str:
+    text = re.sub(r"[^a-z0-9 ]+", " ", (text or "").lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def normalize_priority(priority: str) -> str:
+    """
+    Fold a free-text priority to a canonical label. Exact phrase matches win,
+    then any known phrase contained in the text; otherwise the cleaned text itself.
+    """
+    cleaned = _clean(priority)
+
+    if cleaned in _PHRASE_TO_PRIORITY:
+        return _PHRASE_TO_PRIORITY[cleaned]
+
+    padded = f" {cleaned} "
+    # Longest phrase first so "battery life" beats "life"-like partial hits
+    for phrase in sorted(_PHRASE_TO_PRIORITY, key=len, reverse=True):
+        if f" {phrase} " in padded:
+            return _PHRASE_TO_PRIORITY[phrase]
+
+    return cleaned
+
+
+def budget_bucket(max_price: float) -> int:
+    """Nearest 5000-step price_range value."""
+    return int(round(max_price / PRICE_BUCKET_STEP) * PRICE_BUCKET_STEP)
+
+
+def cache_key(max_price: float, priority: str) -> str:
+    return f"{budget_bucket(max_price)}:{normalize_priority(priority)}"
+
+
+class RecommendationCache:
+    def __init__(self, db, ttl: int = CACHE_TTL_SECONDS, max_entries: int = CACHE_MAX_ENTRIES,
+                 use_mongo: bool = USE_MONGO_TIER):
+        self.ttl = ttl
+        self._memory = TTLCache(maxsize=max_entries, ttl=ttl)
+
+        self._state = db["pipeline_state"]
+        self._collection = db["recommendation_cache"] if use_mongo else None
+
+        self._phones_version = None
+        self._version_checked_at = 0.0
+
+    async def ensure_indexes(self):
+        if self._collection is not None:
+            await self._collection.create_index("created_at", expireAfterSeconds=self.ttl)
+
+    # =====================================================
+    # INVALIDATION (TIED TO THE PHONES REFRESH)
+    # =====================================================
+    async def phones_version(self):
+        """Last phones refresh stamp (re-read at most every REFRESH_CHECK_SECONDS)."""
+        now = time.monotonic()
+        if now - self._version_checked_at < REFRESH_CHECK_SECONDS:
+            return self._phones_version
+
+        self._version_checked_at = now
+        try:
+            state = await self._state.find_one({"_id": "phones"}, {"refreshed_at": 1})
+        except Exception as e:
+            print(f"Recommendation cache: could not read phones refresh stamp: {e}")
+            return self._phones_version
+
+        version = state.get("refreshed_at") if state else None
+        if version != self._phones_version:
+            self._memory.clear()
+            self._phones_version = version
+
+        return version
+
+    # =====================================================
+    # GET / SET
+    # =====================================================
+    async def get(self, key: str):
+        version = await self.phones_version()
+
+        value = self._memory.get(key)
+        if value is not None:
+            return value
+
+        if self._collection is None:
+            return None
+
+        try:
+            doc = await self._collection.find_one({"_id": key})
+        except Exception as e:
+            print(f"Recommendation cache: Mongo read failed: {e}")
+            return None
+
+        if not doc or doc.get("phones_version") != version:
+            return None
+
+        self._memory[key] = doc["value"]
+        return doc["value"]
+
+    async def set(self, key: str, value: dict):
+        version = await self.phones_version()
+
+        self._memory[key] = value
+
+        if self._collection is not None:
+            try:
+                await self._collection.update_one(
+                    {"_id": key},
+                    {"$set": {
+                        "value": value,
+                        "phones_version": version,
+                        "created_at": datetime.utcnow()
+                    }},
+                    upsert=True
+                )
+            except Exception as e:
+                print(f"Recommendation cache: Mongo write failed: {e}")
+
@@ -1,18 +1,53 @@
 # recommendation_service.py
 
 from dotenv import load_dotenv
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
 from langchain_google_genai import ChatGoogleGenerativeAI
+import asyncio
 import os
+import time
 from pydantic import BaseModel, Field
 
+from models import NewMobile
+
+from RecommendationEngine.candidate_ranker import CandidateRanker
+from RecommendationEngine.spec_ranker import SpecCatalogue, profile_for_priority
+from RecommendationEngine.recommendation_cache import (
+    RecommendationCache,
+    budget_bucket,
+    cache_key,
+    normalize_priority,
+)
+from RecommendationEngine.recommendation_views import (
+    VIEW_PRIORITIES,
+    RecommendationViews,
+    affected_buckets,
+    view_expiry,
+)
 
 load_dotenv()
 
 MONGO_URI = os.getenv("MONGO_CONNECTION_STRING")
-client = MongoClient(MONGO_URI)
+client = AsyncIOMotorClient(MONGO_URI)
 db = client["MobileDB"]
-recommended_collection = db["phones"]
+# One document per handset, merged across review videos by the YouTube cron
+recommended_collection = db["phone_catalogue"]
+specs_collection = db["new_mobiles"]   # spec sheets written by DataCronJob/spec_sheet_service.py
+
+PRICE_WINDOW = 5000
+MAX_CANDIDATES = int(os.getenv("RECOMMENDATION_MAX_CANDIDATES", 60))
+
+# Outbound LLM calls: at most this many in flight per worker, each bounded in time
+LLM_CONCURRENCY = int(os.getenv("RECOMMENDATION_LLM_CONCURRENCY", 8))
+LLM_TIMEOUT_SECONDS = float(os.getenv("RECOMMENDATION_LLM_TIMEOUT", 60))
+llm_semaphore = asyncio.Semaphore(LLM_CONCURRENCY)
+
+# Parsed spec sheets for the offline ranker are reloaded at most this often
+SPEC_CATALOGUE_TTL_SECONDS = int(os.getenv("RECOMMENDATION_SPECS_TTL", 60 * 60))
+
+recommendation_cache = RecommendationCache(db)
+recommendation_views = RecommendationViews(db)
+candidate_ranker = CandidateRanker(recommended_collection)
 
 
 model = ChatGoogleGenerativeAI(
@@ -26,18 +61,43 @@ class PhoneRecommendationInput(BaseModel):
     priority: str = Field(description="User's priority (e.g., gaming performance, camera, battery life)")
 
 
+_indexes_ready = False
 
-def get_recommendations(max_price: float, priority: str):
-    """    Recommend phones under a price limit based on user priority.
+
+async def ensure_indexes():
+    global _indexes_ready
+    if _indexes_ready:
+        return
+
+    # Backs the price-window $match/$sort below (same key directions as the sort,
+    # so the capped scan needs no in-memory sort)
+    await recommended_collection.create_index([("price_range", -1), ("phone_name", 1)])
+    await recommendation_cache.ensure_indexes()
+    await recommendation_views.ensure_indexes()
+    _indexes_ready = True
+
+
+async def fetch_price_window(max_price: float) -> list:
+    """
+    Phones priced within ±PRICE_WINDOW of the budget. The catalogue already
+    holds one entity per handset (descriptions merged across videos), so this
+    is a capped index range scan.
     """
-    phones = list(recommended_collection.find({
-        "price_range": {"$lte": max_price + 5000},
-        "price_range": {"$gte": max_price - 5000}
-    }))
+    await ensure_indexes()
+
+    cursor = recommended_collection.find(
+        {"price_range": {
+            "$gte": max_price - PRICE_WINDOW,
+            "$lte": max_price + PRICE_WINDOW
+        }},
+        {"_id": 0, "phone_name": 1, "description": 1, "price_range": 1, "updated_at": 1}
+    ).sort([("price_range", -1), ("phone_name", 1)]).limit(MAX_CANDIDATES)
+
+    return await cursor.to_list(length=MAX_CANDIDATES)
 
-    if not phones:
-        return {"recommendations": "No phones found in this price range."}
 
+
+def build_recommendation_prompt(max_price: float, priority: str, phones: list) -> str:
     candidates = []
     for idx, phone in enumerate(phones, 1):
         phone_name = phone.get("phone_name", "Unknown Phone")
@@ -46,7 +106,7 @@ def get_recommendations(max_price: float, priority: str):
         price_str = str(price_range) if price_range else "Price not available"
         candidates.append(f"{idx}. {phone_name} – {desc} – {price_str}")
 
-    prompt = f"""
+    return f"""
 The user wants a phone with priority: {priority}.
 Their budget is around {max_price}.
 
@@ -80,5 +140,229 @@ Keep explanations concise and structured in short paragraphs.
 """
 
 
-    response = model.invoke(prompt)
-    return {"recommendations": response.text}
\ No newline at end of file
+async def _prepare_recommendation(max_price: float, priority: str):
+    """
+    Returns (cache_key, ready_result, prompt): ready_result is set on a cache or
+    view hit or when there is nothing to rank, otherwise prompt is ready for the LLM.
+    """
+    key = cache_key(max_price, priority)
+    cached = await recommendation_cache.get(key)
+    if cached is not None:
+        return key, cached, None
+
+    # Common (bucket, priority) pairs are precomputed by the YouTube cron
+    view = await recommendation_views.get(key, await recommendation_cache.phones_version())
+    if view is not None:
+        await recommendation_cache.set(key, view)
+        return key, view, None
+
+    # Query and prompt use the bucketed budget so the cached answer is valid for the whole bucket
+    max_price = budget_bucket(max_price)
+    priority = normalize_priority(priority)
+
+    phones = await fetch_price_window(max_price)
+
+    if not phones:
+        result = {"recommendations": "No phones found in this price range."}
+        await recommendation_cache.set(key, result)
+        return key, result, None
+
+    # Only the best local matches go into the prompt
+    await candidate_ranker.refresh(await recommendation_cache.phones_version())
+    phones = candidate_ranker.rank(phones, priority)
+
+    return key, None, build_recommendation_prompt(max_price, priority, phones)
+
+
+def _chunk_text(chunk) -> str:
+    content = getattr(chunk, "content", "")
+    if isinstance(content, str):
+        return content
+    # Some providers stream a list of content parts
+    return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+
+
+async def get_recommendations(max_price: float, priority: str):
+    """    Recommend phones under a price limit based on user priority.
+    Responses are cached per (budget bucket, normalized priority).
+    Raises asyncio.TimeoutError if the LLM does not answer in LLM_TIMEOUT_SECONDS.
+    """
+    key, result, prompt = await _prepare_recommendation(max_price, priority)
+    if result is not None:
+        return result
+
+    async with llm_semaphore:
+        response = await asyncio.wait_for(model.ainvoke(prompt), timeout=LLM_TIMEOUT_SECONDS)
+
+    result = {"recommendations": response.text}
+    await recommendation_cache.set(key, result)
+    return result
+
+
+async def stream_recommendations(max_price: float, priority: str):
+    """
+    Same as get_recommendations, but yields the text as the LLM generates it.
+    The complete text is cached once the stream finishes.
+    """
+    key, result, prompt = await _prepare_recommendation(max_price, priority)
+    if result is not None:
+        yield result["recommendations"]
+        return
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + LLM_TIMEOUT_SECONDS
+    parts = []
+
+    async with llm_semaphore:
+        stream = model.astream(prompt).__aiter__()
+        try:
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(stream.__anext__(), timeout=max(deadline - loop.time(), 0))
+                except StopAsyncIteration:
+                    break
+
+                text = _chunk_text(chunk)
+                if text:
+                    parts.append(text)
+                    yield text
+        finally:
+            await stream.aclose()
+
+    await recommendation_cache.set(key, {"recommendations": "".join(parts)})
+
+
+
+# =====================================================
+# MATERIALIZED VIEWS (BUILT BY THE YOUTUBE CRON)
+# =====================================================
+async def _build_view(bucket: int, priority: str, phones: list, phones_version):
+    if not phones:
+        value, candidates = {"recommendations": "No phones found in this price range."}, []
+    else:
+        ranked = candidate_ranker.rank(phones, priority)
+        candidates = [p["phone_name"] for p in ranked]
+        async with llm_semaphore:
+            response = await asyncio.wait_for(
+                model.ainvoke(build_recommendation_prompt(bucket, priority, ranked)),
+                timeout=LLM_TIMEOUT_SECONDS
+            )
+        value = {"recommendations": response.text}
+
+    await recommendation_views.put(bucket, priority, value, candidates, phones_version, view_expiry(phones))
+
+
+async def materialize_views(price_ranges=None) -> dict:
+    """
+    Rebuild the stored recommendations for every VIEW_PRIORITIES entry in each
+    budget bucket affected by the given price_range values (all buckets when None).
+    LLM calls run concurrently up to LLM_CONCURRENCY.
+    """
+    await ensure_indexes()
+
+    if price_ranges is None:
+        price_ranges = await recommended_collection.distinct("price_range")
+    buckets = affected_buckets(price_ranges)
+
+    phones_version = await recommendation_cache.phones_version()
+    await candidate_ranker.refresh(phones_version)
+
+    tasks = []
+    for bucket in buckets:
+        phones = await fetch_price_window(bucket)
+        for priority in VIEW_PRIORITIES:
+            tasks.append(_build_view(bucket, priority, phones, phones_version))
+
+    outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+    failed = [o for o in outcomes if isinstance(o, BaseException)]
+    for error in failed[:3]:
+        print(f"Recommendation view build failed: {error!r}")
+
+    # New phones only change the affected buckets; the rest stay valid for this version
+    restamped = await recommendation_views.restamp(phones_version, buckets)
+
+    summary = {
+        "buckets": len(buckets), "built": len(tasks) - len(failed),
+        "failed": len(failed), "restamped": restamped
+    }
+    print(f"✅ Materialized recommendation views: {summary}")
+    return summary
+
+
+def refresh_recommendation_views(price_ranges=None) -> dict:
+    """Blocking entry point for the (synchronous) cron scripts."""
+    return asyncio.run(materialize_views(price_ranges))
+
+
+
+# =====================================================
+# OFFLINE SPEC RANKER (+ OPTIONAL LLM NARRATIVE)
+# =====================================================
+_spec_catalogue = None
+_spec_catalogue_loaded_at = 0.0
+
+
+async def load_spec_catalogue() -> SpecCatalogue:
+    global _spec_catalogue, _spec_catalogue_loaded_at
+
+    if _spec_catalogue is not None and time.monotonic() - _spec_catalogue_loaded_at < SPEC_CATALOGUE_TTL_SECONDS:
+        return _spec_catalogue
+
+    mobiles = []
+    async for doc in specs_collection.find({}, {"_id": 0}):
+        try:
+            mobiles.append(NewMobile(**doc))
+        except Exception:
+            continue
+
+    if not mobiles:
+        print("⚠️ new_mobiles is empty; run DataCronJob/spec_sheet_service.py to build spec sheets")
+
+    _spec_catalogue = await asyncio.to_thread(SpecCatalogue, mobiles)
+    _spec_catalogue_loaded_at = time.monotonic()
+    return _spec_catalogue
+
+
+def build_narrative_prompt(max_price: float, priority: str, ranked: list) -> str:
+    lines = [
+        f"{r['rank']}. {r['brand'] or ''} {r['model'] or ''} – Rs {r['price']:,} – specs: {r['specs']}"
+        for r in ranked
+    ]
+    return f"""
+The user wants a phone with priority: {priority}.
+Their budget is {max_price}.
+
+These phones are already ranked by a spec-based scoring model:
+{chr(10).join(lines)}
+
+Instructions:
+1. Keep exactly this order; do not add, remove or re-rank phones.
+2. For each phone, explain in 2-3 sentences why it fits the priority, using the specs given.
+Always use the currency Rs.
+
+Use **bold text** for phone names and prices.
+
+Avoid emojis; keep the tone professional and concise.
+"""
+
+
+async def get_ranked_recommendations(max_price: float, priority: str, top_k: int = 10, narrate: bool = False):
+    """
+    Spec-based ranking of NewMobile sheets within budget (no LLM needed).
+    With narrate=True the LLM only writes an explanation over the fixed ranking.
+    """
+    profile = profile_for_priority(normalize_priority(priority))
+    catalogue = await load_spec_catalogue()
+    ranked = catalogue.rank(max_price, profile, top_k)
+
+    result = {"profile": profile, "recommendations": ranked}
+
+    if narrate and ranked:
+        async with llm_semaphore:
+            response = await asyncio.wait_for(
+                model.ainvoke(build_narrative_prompt(max_price, profile, ranked)),
+                timeout=LLM_TIMEOUT_SECONDS
+            )
+        result["narrative"] = response.text
+
+    return result
@@ -0,0 +1,99 @@
+# recommendation_views.py
+#
+# Materialized recommendation views. `phones` only changes when the YouTube
+# cron runs, so the answer for each (budget bucket, canonical priority) pair is
+# static between runs. The cron rebuilds the views for the buckets touched by
+# newly ingested phones (see recommendation_service.materialize_views) and the
+# API serves them directly, falling back to live generation for priorities
+# that are not in VIEW_PRIORITIES.
+#
+# A view is only served while it is fresh: built against the current phones
+# version (untouched buckets are re-stamped after each rebuild) and before
+# the first of its candidate phones expires from the catalogue (TTL), after
+# which the TTL index on expires_at removes it and the bucket is generated live.
+#
+# `db` is an async (Motor) database; all Mongo access is awaited.
+
+from datetime import datetime, timedelta
+
+from RecommendationEngine.recommendation_cache import PRICE_BUCKET_STEP, PRIORITY_SYNONYMS
+
+# Views are built for every canonical priority
+VIEW_PRIORITIES = list(PRIORITY_SYNONYMS)
+
+# Same bounds the extractor accepts for price_range
+MIN_BUCKET = 5000
+MAX_BUCKET = 200000
+
+# Same lifetime as the phone_catalogue documents (DataCronJob/phone_catalogue.py)
+CATALOGUE_TTL_SECONDS = 60 * 24 * 60 * 60
+
+
+def view_expiry(phones: list):
+    """When the first phone of the view leaves the catalogue (None: no dated phones)."""
+    updated = [p["updated_at"] for p in phones if p.get("updated_at")]
+    return min(updated) + timedelta(seconds=CATALOGUE_TTL_SECONDS) if updated else None
+
+
+def affected_buckets(price_ranges, window: int = PRICE_BUCKET_STEP) -> list:
+    """
+    Buckets whose price window (bucket ± window) contains any of the given
+    price_range values, i.e. the views that new phones can change.
+    """
+    buckets = set()
+    for price_range in price_ranges:
+        if price_range is None:
+            continue
+        for offset in range(-window, window + 1, PRICE_BUCKET_STEP):
+            bucket = int(price_range) + offset
+            if MIN_BUCKET <= bucket <= MAX_BUCKET:
+                buckets.add(bucket)
+    return sorted(buckets)
+
+
+class RecommendationViews:
+    def __init__(self, db):
+        self._collection = db["recommendation_views"]
+
+    async def ensure_indexes(self):
+        await self._collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def get(self, key: str, phones_version=None):
+        """Stored recommendation for a cache_key() if still fresh, or None."""
+        try:
+            doc = await self._collection.find_one(
+                {
+                    "_id": key,
+                    "phones_version": phones_version,
+                    "$or": [{"expires_at": None}, {"expires_at": {"$gt": datetime.utcnow()}}],
+                },
+                {"value": 1}
+            )
+        except Exception as e:
+            print(f"Recommendation views: Mongo read failed: {e}")
+            return None
+        return doc["value"] if doc else None
+
+    async def put(self, bucket: int, priority: str, value: dict, candidates: list,
+                  phones_version=None, expires_at=None):
+        await self._collection.update_one(
+            {"_id": f"{bucket}:{priority}"},
+            {"$set": {
+                "bucket": bucket,
+                "priority": priority,
+                "value": value,
+                "candidates": candidates,
+                "phones_version": phones_version,
+                "expires_at": expires_at,
+                "built_at": datetime.utcnow()
+            }},
+            upsert=True
+        )
+
+    async def restamp(self, phones_version, rebuilt_buckets: list) -> int:
+        """Mark views of buckets the new phones cannot change as current."""
+        result = await self._collection.update_many(
+            {"bucket": {"$nin": list(rebuilt_buckets)}},
+            {"$set": {"phones_version": phones_version}}
+        )
+        return result.modified_count
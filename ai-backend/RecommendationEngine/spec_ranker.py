@@ -0,0 +1,222 @@
+# spec_ranker.py
+#
+# Deterministic, offline phone ranker. Parses NewMobile spec sheets into
+# numeric features, scores them against priority profiles with vectorized NumPy
+# and returns a structured ranked list in milliseconds, without an LLM.
+
+import re
+from typing import List, Optional
+
+import numpy as np
+
+from models import NewMobile
+
+# =====================================================
+# FEATURES
+# =====================================================
+# name -> (low, high) reference range; values are clipped and scaled to [0, 1]
+FEATURE_RANGES = {
+    "chipset": (0.0, 1.0),
+    "ram": (2.0, 16.0),
+    "storage": (32.0, 512.0),
+    "battery": (3000.0, 6500.0),
+    "main_camera_mp": (8.0, 200.0),
+    "camera_count": (1.0, 4.0),
+    "selfie_camera_mp": (5.0, 50.0),
+    "screen_size": (5.5, 7.0),
+    "refresh_rate": (60.0, 144.0),
+    "network_5g": (0.0, 1.0),
+    "release_year": (2019.0, 2025.0),
+    "price_fit": (0.0, 1.0),
+}
+
+FEATURES = list(FEATURE_RANGES)
+
+# Priority profiles: feature weights (each row sums to 1)
+PRIORITY_PROFILES = {
+    "gaming": {"chipset": 0.45, "ram": 0.15, "refresh_rate": 0.15, "battery": 0.1,
+               "storage": 0.05, "release_year": 0.05, "price_fit": 0.05},
+    "camera": {"main_camera_mp": 0.3, "camera_count": 0.1, "selfie_camera_mp": 0.15,
+               "chipset": 0.2, "storage": 0.1, "release_year": 0.1, "price_fit": 0.05},
+    "battery": {"battery": 0.55, "chipset": 0.15, "screen_size": 0.05, "release_year": 0.1,
+                "ram": 0.05, "price_fit": 0.1},
+    "performance": {"chipset": 0.5, "ram": 0.2, "storage": 0.1, "release_year": 0.1,
+                    "network_5g": 0.05, "price_fit": 0.05},
+    "display": {"refresh_rate": 0.35, "screen_size": 0.25, "chipset": 0.15,
+                "release_year": 0.1, "price_fit": 0.15},
+    "value": {"chipset": 0.2, "ram": 0.1, "storage": 0.1, "battery": 0.1, "main_camera_mp": 0.1,
+              "refresh_rate": 0.05, "network_5g": 0.05, "release_year": 0.05, "price_fit": 0.25},
+}
+
+DEFAULT_PROFILE = "value"
+
+_PROFILE_WEIGHTS = {
+    name: np.array([weights.get(f, 0.0) for f in FEATURES])
+    for name, weights in PRIORITY_PROFILES.items()
+}
+
+# (pattern, tier score) — first match wins, so more specific patterns come first
+CHIPSET_TIERS = [
+    (r"snapdragon\s*8\s*(gen|elite|\+\s*gen)", 1.0),
+    (r"snapdragon\s*8\s*s\s*gen", 0.9),
+    (r"snapdragon\s*8\d{2}", 0.8),
+    (r"snapdragon\s*7\s*(\+|s)?\s*gen|snapdragon\s*7\d{2}", 0.6),
+    (r"snapdragon\s*6\s*s?\s*gen|snapdragon\s*6\d{2}", 0.42),
+    (r"snapdragon\s*4\s*s?\s*gen|snapdragon\s*4\d{2}", 0.28),
+    (r"dimensity\s*9\d{3}", 1.0),
+    (r"dimensity\s*8\d{3}", 0.78),
+    (r"dimensity\s*7\d{3}|dimensity\s*1\d{3}", 0.6),
+    (r"dimensity\s*6\d{3}|dimensity\s*[78]\d{2}\b", 0.42),
+    (r"helio\s*g9[69]", 0.42),
+    (r"helio\s*g(8\d|9\d)", 0.35),
+    (r"helio", 0.22),
+    (r"apple\s*a1[89]|\ba1[89]\s*(pro|bionic)", 1.0),
+    (r"apple\s*a1[67]|\ba1[67]\s*(pro|bionic)", 0.92),
+    (r"apple\s*a1[345]|\ba1[345]\s*bionic", 0.82),
+    (r"tensor", 0.8),
+    (r"exynos\s*2\d{3}", 0.85),
+    (r"exynos\s*1\d{3}", 0.5),
+    (r"exynos", 0.3),
+    (r"kirin\s*9\d{3}", 0.8),
+    (r"unisoc|spreadtrum", 0.15),
+]
+DEFAULT_CHIPSET_TIER = 0.3
+
+_CHIPSET_PATTERNS = [(re.compile(p, re.I), score) for p, score in CHIPSET_TIERS]
+
+
+# =====================================================
+# SPEC PARSING
+# =====================================================
+def _numbers(text: Optional[str]) -> List[float]:
+    if not text:
+        return []
+    return [float(n) for n in re.findall(r"\d+(?:\.\d+)?", text.replace(",", ""))]
+
+
+def parse_memory_gb(text: Optional[str]) -> float:
+    """'8GB', '8/12 GB', '1TB' -> largest size in GB."""
+    if not text:
+        return np.nan
+    values = _numbers(text)
+    if not values:
+        return np.nan
+    return max(values) * (1024 if re.search(r"\btb\b|\dtb", text, re.I) else 1)
+
+
+def parse_chipset_tier(chipset: Optional[str], cpu: Optional[str] = None) -> float:
+    text = f"{chipset or ''} {cpu or ''}".strip()
+    if not text:
+        return np.nan
+    for pattern, score in _CHIPSET_PATTERNS:
+        if pattern.search(text):
+            return score
+    return DEFAULT_CHIPSET_TIER
+
+
+def parse_camera(text: Optional[str]):
+    """'50 MP + 8 MP + 2 MP' -> (50.0, 3)."""
+    if not text:
+        return np.nan, np.nan
+    megapixels = [float(m) for m in re.findall(r"(\d+(?:\.\d+)?)\s*mp", text, re.I)]
+    if not megapixels:
+        values = _numbers(text)
+        megapixels = values[:1]
+    if not megapixels:
+        return np.nan, np.nan
+    return max(megapixels), float(len(megapixels))
+
+
+def parse_refresh_rate(*texts: Optional[str]) -> float:
+    for text in texts:
+        match = re.search(r"(\d{2,3})\s*hz", text or "", re.I)
+        if match:
+            return float(match.group(1))
+    return np.nan
+
+
+def parse_price(text: Optional[str]) -> float:
+    values = _numbers(text)
+    return values[0] if values else np.nan
+
+
+def spec_features(mobile: NewMobile) -> dict:
+    main_mp, camera_count = parse_camera(mobile.main_camera)
+    selfie_mp, _ = parse_camera(mobile.selfie_camera)
+    screen = _numbers(mobile.screen_size)
+    battery = _numbers(mobile.battery_capacity)
+
+    return {
+        "chipset": parse_chipset_tier(mobile.chipset, mobile.cpu),
+        "ram": parse_memory_gb(mobile.ram),
+        "storage": parse_memory_gb(mobile.storage),
+        "battery": max(battery) if battery else np.nan,
+        "main_camera_mp": main_mp,
+        "camera_count": camera_count,
+        "selfie_camera_mp": selfie_mp,
+        "screen_size": screen[0] if screen else np.nan,
+        "refresh_rate": parse_refresh_rate(mobile.screen_resolution, mobile.screen_size),
+        "network_5g": float("5g" in (mobile.network or "").lower()) if mobile.network else np.nan,
+        "release_year": float(mobile.release_year) if mobile.release_year else np.nan,
+    }
+
+
+# =====================================================
+# CATALOGUE (PARSED ONCE, RANKED MANY TIMES)
+# =====================================================
+class SpecCatalogue:
+    def __init__(self, mobiles: List[NewMobile]):
+        self.mobiles = mobiles
+        rows = [spec_features(m) for m in mobiles]
+
+        # Raw feature matrix (NaN = unknown); price_fit is filled per query
+        self.raw = np.array(
+            [[row.get(f, np.nan) for f in FEATURES] for row in rows], dtype=float
+        ).reshape(len(mobiles), len(FEATURES))
+        self.prices = np.array([parse_price(m.price) for m in mobiles], dtype=float)
+
+        low = np.array([FEATURE_RANGES[f][0] for f in FEATURES])
+        high = np.array([FEATURE_RANGES[f][1] for f in FEATURES])
+        # Unknown specs score as the bottom of the range
+        self.scaled = np.nan_to_num(np.clip((self.raw - low) / (high - low), 0.0, 1.0), nan=0.0)
+
+    def __len__(self):
+        return len(self.mobiles)
+
+    def rank(self, max_price: float, profile: str, top_k: int = 10) -> List[dict]:
+        weights = _PROFILE_WEIGHTS.get(profile, _PROFILE_WEIGHTS[DEFAULT_PROFILE])
+
+        in_budget = np.flatnonzero(~np.isnan(self.prices) & (self.prices <= max_price))
+        if not len(in_budget):
+            return []
+
+        features = self.scaled[in_budget].copy()
+        # Cheaper within the budget scores higher on price_fit
+        features[:, FEATURES.index("price_fit")] = 1.0 - self.prices[in_budget] / max(max_price, 1.0)
+
+        scores = features @ weights
+        # Ties broken by lower price, then catalogue order (stable)
+        order = np.lexsort((self.prices[in_budget], -scores))[:top_k]
+
+        results = []
+        for rank, i in enumerate(order, 1):
+            idx = in_budget[i]
+            mobile = self.mobiles[idx]
+            results.append({
+                "rank": rank,
+                "brand": mobile.brand,
+                "model": mobile.model,
+                "price": int(self.prices[idx]),
+                "score": round(float(scores[i]), 4),
+                "specs": {
+                    f: float(self.raw[idx, j])
+                    for j, f in enumerate(FEATURES)
+                    if f != "price_fit" and not np.isnan(self.raw[idx, j])
+                },
+            })
+
+        return results
+
+
+def profile_for_priority(normalized_priority: str) -> str:
+    return normalized_priority if normalized_priority in PRIORITY_PROFILES else DEFAULT_PROFILE
@@ -1,8 +1,10 @@
 from fastapi import FastAPI, UploadFile, File, Form,HTTPException
 from typing import List, Optional
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 import requests
 import os
+import json
+import asyncio
 import shutil
 import uuid
 from pydantic import BaseModel
@@ -13,8 +15,12 @@ from report_generator import generate_damage_report
 from models import UsedMobile
 from DamageDetection.Damage_Detection import analyze_phone_images
 from ConditionScoring.condition_scoring import compute_condition_score
-from PricePrediction.predict_price_service import run_pipeline
-from RecommendationEngine.recommendation_service import get_recommendations
+from PricePrediction.predict_price_service import run_pipeline, run_batch_pipeline
+from RecommendationEngine.recommendation_service import (
+    get_ranked_recommendations,
+    get_recommendations,
+    stream_recommendations,
+)
              
 
 app = FastAPI(title="IntelliFone AI Backend")
@@ -172,6 +178,34 @@ async def price_prediction(
 
 
 
+# ============================================================
+#  ENDPOINT 3B — BATCH PRICE PREDICTION (LISTING IMPORTS)
+# ============================================================
+class BatchPricePredictionItem(BaseModel):
+    mobile: UsedMobile
+    ai_flags: dict = {}
+
+
+class BatchPricePredictionRequest(BaseModel):
+    items: List[BatchPricePredictionItem]
+
+
+@app.post("/price-prediction/batch/")
+def batch_price_prediction(request: BatchPricePredictionRequest):
+    if not request.items:
+        raise HTTPException(
+            status_code=400,
+            detail="At least one phone is required"
+        )
+
+    results = run_batch_pipeline(
+        [(item.mobile, item.ai_flags) for item in request.items]
+    )
+
+    return {"results": results}
+
+
+
 # ============================================================
 #  ENDPOINT 4 — FULL VERIFICATION PIPELINE
 # ============================================================
@@ -276,4 +310,40 @@ async def full_verification(
 # ============================================================
 @app.get("/recommend/")
 async def recommend_phones(max_price: float, priority: str):
-    return get_recommendations(max_price, priority)
+    try:
+        return await get_recommendations(max_price, priority)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=504,
+            detail="Recommendation generation timed out"
+        )
+
+
+@app.get("/recommend/stream/")
+async def recommend_phones_stream(max_price: float, priority: str):
+    """Server-sent events: one `data` event per generated text fragment, then `done`."""
+    async def events():
+        try:
+            async for text in stream_recommendations(max_price, priority):
+                yield f"data: {json.dumps({'text': text})}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+            return
+        yield "event: done\ndata: {}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/recommend/ranked/")
+async def recommend_phones_ranked(max_price: float, priority: str, top_k: int = 10, narrate: bool = False):
+    try:
+        return await get_ranked_recommendations(max_price, priority, top_k, narrate)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=504,
+            detail="Recommendation narrative timed out"
+        )
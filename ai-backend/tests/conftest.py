@@ -0,0 +1,10 @@
+# Tests run from ai-backend/ (python -m pytest tests); modules import each other
+# the same way the services do: packages from ai-backend/, DataCronJob scripts by name.
+import os
+import sys
+
+AI_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+for path in (AI_BACKEND, os.path.join(AI_BACKEND, "DataCronJob")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
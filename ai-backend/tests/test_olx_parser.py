@@ -0,0 +1,24 @@
+from olx_parser import available_parsers, check_fixtures, load_fixtures, parse_search_page
+
+
+def test_fixtures_parse_as_expected_with_every_backend():
+    assert load_fixtures()
+    assert check_fixtures() == []
+
+
+def test_search_cards_missing_a_field_are_skipped():
+    html = b"""
+    <ul>
+    <li aria-label="Listing"><a href="/item/1"><h2 class="_1093b649">Pixel 6a</h2></a>
+      <div aria-label="Price"><span>Rs 60,000</span></div><span class="f047db22">Lahore, Punjab</span></li>
+    <li aria-label="Listing"><a href="/item/2"><h2 class="_1093b649">Pixel 7</h2></a>
+      <span class="f047db22">Karachi, Sindh</span></li>
+    </ul>
+    """
+    for parser in available_parsers():
+        assert parse_search_page(html, parser) == [{
+            "title": "Pixel 6a",
+            "price": "Rs 60,000",
+            "location": "Lahore, Punjab",
+            "link": "https://www.olx.com.pk/item/1",
+        }]
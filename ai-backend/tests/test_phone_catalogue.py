@@ -0,0 +1,120 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from phone_catalogue import best_match, merge_phones
+from phone_matcher import name_key
+
+
+def _matches(doc, query):
+    for field, condition in query.items():
+        value = doc.get(field)
+        values = value if isinstance(value, list) else [value]
+        if not set(values) & set(condition["$in"]):
+            return False
+    return True
+
+
+class FakeCatalogue:
+    """Stands in for the phone_catalogue collection ($in queries only); counts reads."""
+
+    def __init__(self, docs=(), latency=0.0):
+        self.docs = {d["_id"]: d for d in docs}
+        self.latency = latency
+        self.reads = 0
+        self.requests = []
+
+    def find(self, query, projection=None):
+        self.reads += 1
+        found = [dict(d) for d in self.docs.values() if _matches(d, query)]
+        time.sleep(self.latency)
+        return found
+
+    def bulk_write(self, requests, ordered=True):
+        self.requests.extend(requests)
+        for request in requests:
+            self.docs[request._filter["_id"]] = request._doc
+
+
+def entities(collection):
+    return {r._filter["_id"]: r._doc for r in collection.requests}
+
+
+def test_best_match_requires_same_brand():
+    candidates = [
+        {"_id": "oneplus 12", "keys": ["oneplus 12"]},
+        {"_id": "xiaomi 12 pro", "keys": ["xiaomi 12 pro"]},
+    ]
+    assert best_match(name_key("One Plus 12 5G"), candidates) == "oneplus 12"
+    assert best_match(name_key("Xiaomi 12"), candidates) is None
+    assert best_match(name_key("Realme 12"), candidates) is None
+
+
+def test_entities_are_keyed_by_brand_and_model():
+    collection = FakeCatalogue()
+    merge_phones(collection, "video-1", [
+        {"phone_name": "OnePlus 12", "description": "Fast charging.", "price_range": 200000},
+        {"phone_name": "Xiaomi 12", "description": "Good value.", "price_range": 120000},
+        {"phone_name": "OnePlus 12 5G", "description": "Great display.", "price_range": None},
+    ])
+
+    merged = entities(collection)
+    assert set(merged) == {"oneplus 12", "xiaomi 12"}
+    assert merged["oneplus 12"]["brand"] == "oneplus"
+    assert merged["xiaomi 12"]["description"] == "Good value."
+    # One provenance entry per video
+    assert len(merged["oneplus 12"]["sources"]) == 1
+
+
+def test_batch_resolves_with_a_fixed_number_of_reads():
+    collection = FakeCatalogue()
+    merge_phones(collection, "video-1", [
+        {"phone_name": "Infinix GT 20 Pro", "description": "Gaming phone.", "price_range": 70000},
+        {"phone_name": "Samsung Galaxy S24 Ultra", "description": "Flagship.", "price_range": 350000},
+    ])
+
+    collection.reads = 0
+    merge_phones(collection, "video-2", [
+        {"phone_name": "infinix gt20 pro", "description": "Cool design.", "price_range": 72000},
+        {"phone_name": "Samsung Glaxy S24 Ultra 5G", "description": "Great zoom.", "price_range": None},
+        {"phone_name": "Tecno Camon 30", "description": "Selfies.", "price_range": 60000},
+    ])
+
+    assert collection.reads <= 3
+    merged = entities(collection)
+    assert len(merged["infinix gt 20 pro"]["sources"]) == 2
+    assert merged["infinix gt 20 pro"]["price_range"] == 72000
+    assert len(merged["samsung galaxy s 24 ultra"]["sources"]) == 2
+    assert "tecno camon 30" in merged
+
+
+def test_concurrent_merges_keep_every_source():
+    collection = FakeCatalogue(latency=0.01)
+
+    def merge(n):
+        merge_phones(collection, f"video-{n}", [
+            {"phone_name": "Infinix GT 20 Pro", "description": f"Review {n}.", "price_range": 70000},
+        ])
+
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        list(executor.map(merge, range(6)))
+
+    sources = collection.docs["infinix gt 20 pro"]["sources"]
+    assert sorted(s["video_id"] for s in sources) == [f"video-{n}" for n in range(6)]
+
+
+def test_repriced_entities_report_their_old_budget():
+    collection = FakeCatalogue()
+    merge_phones(collection, "video-1", [
+        {"phone_name": "Infinix GT 20 Pro", "description": "Gaming phone.", "price_range": 70000},
+        {"phone_name": "Tecno Camon 30", "description": "Selfies.", "price_range": 60000},
+    ])
+
+    repriced = set()
+    merge_phones(collection, "video-2", [
+        {"phone_name": "Infinix GT 20 Pro", "description": "Price cut.", "price_range": 60000},
+        {"phone_name": "Tecno Camon 30", "description": "Still good.", "price_range": 60000},
+        {"phone_name": "Xiaomi 14", "description": "New.", "price_range": 150000},
+    ], repriced)
+
+    assert repriced == {70000, 60000}
+    assert collection.docs["infinix gt 20 pro"]["price_range"] == 60000
@@ -0,0 +1,81 @@
+import pytest
+
+from phone_matcher import (
+    PhoneMatcher,
+    consolidate_phones,
+    name_brand,
+    name_key,
+    name_similarity,
+    title_matches_model,
+)
+
+
+@pytest.mark.parametrize("a, b", [
+    ("Infinix GT 20 Pro", "infinix gt20 pro"),
+    ("Infinix GT 20 Pro", "Infinix GT 20 Pro 5G"),
+    ("Samsung Galaxy S23", "Galaxy S23"),
+    ("Redmi Note 13 Pro", "Xiaomi Redmi Note 13 Pro 8/256 PTA approved"),
+    ("Pixel 6A", "Google Pixel 6a 128GB"),
+    ("OnePlus 12", "One Plus 12"),
+])
+def test_same_handset(a, b):
+    assert name_key(a) == name_key(b)
+
+
+@pytest.mark.parametrize("a, b", [
+    ("OnePlus 12", "Xiaomi 12"),
+    ("Realme 11 Pro", "OnePlus 11 Pro"),
+    ("iPhone 15", "iPhone 15 Pro"),
+    ("Galaxy A52", "Galaxy A52s"),
+    ("Pixel 6", "Pixel 6A"),
+    ("Galaxy S23", "Galaxy S24"),
+])
+def test_different_handsets(a, b):
+    assert name_similarity(a, b) == 0.0
+
+
+def test_brand_from_series_word():
+    assert name_brand("iPhone 15") == "apple"
+    assert name_brand("Redmi Note 13") == "xiaomi"
+    assert name_brand("Note 13", brand="Infinix") == "infinix"
+    assert name_brand("Phone 12") is None
+
+
+def test_consolidate_keeps_brands_apart():
+    phones = consolidate_phones([
+        {"phone_name": "OnePlus 12", "description": "Fast charging.", "price_range": 200000},
+        {"phone_name": "Xiaomi 12", "description": "Good value.", "price_range": None},
+        {"phone_name": "oneplus 12 5G", "description": "Great display.", "price_range": None},
+    ])
+
+    assert [p["phone_name"] for p in phones] == ["OnePlus 12", "Xiaomi 12"]
+    assert phones[0]["description"] == "Fast charging. Great display."
+    assert phones[0]["price_range"] == 200000
+
+
+def test_matcher_tolerates_spelling_noise():
+    matcher = PhoneMatcher()
+    entry = matcher.add("Infinix Hot 40 Pro")
+    assert matcher.match("Infinix Hott 40 Pro")[0] == entry
+    assert matcher.match("Tecno Hot 40 Pro") is None
+
+
+@pytest.mark.parametrize("title, model, brand", [
+    ("S23ultra pta", "Galaxy S23 Ultra", "Samsung"),
+    ("Infinix hot 40 i", "Hot 40i", "Infinix"),
+    ("Google Pixel 6A official PTA approved 6gb 128gb", "Pixel 6A", "Google"),
+    ("pixel 6a nothing wrong with it", "Pixel 6A", "Google"),
+    ("Redmi note 13 8/256", "Redmi Note 13", "Xiaomi"),
+])
+def test_title_prefilter_keeps_plausible_titles(title, model, brand):
+    assert title_matches_model(title, model, brand)
+
+
+@pytest.mark.parametrize("title, model, brand", [
+    ("iPhone 13 Pro 256", "iPhone 13", "Apple"),
+    ("Realme 12 pro", "12", "OnePlus"),
+    ("Pixel 7 pta", "Pixel 6A", "Google"),
+    ("A52s 8/128", "Galaxy A52", "Samsung"),
+])
+def test_title_prefilter_rejects_clear_mismatches(title, model, brand):
+    assert not title_matches_model(title, model, brand)
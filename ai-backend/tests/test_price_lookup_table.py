@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+
+from PricePrediction.price_lookup_table import GRID_FLAGS, PriceLookupTable
+
+
+def training_frame(rows=300, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "ram": rng.choice([4, 6, 8], rows),
+        "storage": rng.choice([64, 128, 256], rows),
+        "condition": np.full(rows, np.nan),
+        "condition_score": rng.uniform(0, 20, rows),
+    })
+    for name in GRID_FLAGS:
+        df[name] = rng.integers(0, 2, rows)
+    df["price"] = 20000 + 3000 * df["ram"] + 40 * df["storage"] + 900 * df["condition_score"] - 8000 * df["screen_crack"]
+    return df.astype(np.float32)
+
+
+def request_row(**overrides):
+    row = {"ram": 6.0, "storage": 128.0, "condition": np.nan, "condition_score": 13.3}
+    row.update({name: 0 for name in GRID_FLAGS})
+    row.update(overrides)
+    return pd.DataFrame([row])
+
+
+def fit(model, df):
+    return model.fit(df.drop(columns=["price"]), df["price"])
+
+
+def test_tree_lookup_is_exact():
+    df = training_frame()
+    model = fit(RandomForestRegressor(n_estimators=10, max_depth=6, random_state=0), df)
+    table = PriceLookupTable.build(model, df)
+
+    assert table.thresholds is not None
+    for score in (0.0, 4.2, 9.99, 13.3, 20.0):
+        row = request_row(condition_score=score, screen_crack=1)
+        expected = model.predict(row[model.feature_names_in_].astype(np.float32))[0]
+        assert table.lookup(row) == pytest.approx(expected, rel=1e-5)
+
+
+def test_linear_model_uses_interpolated_buckets():
+    # LinearRegression cannot take the all-NaN pinned column
+    df = training_frame().drop(columns=["condition"])
+    model = fit(LinearRegression(), df)
+    table = PriceLookupTable.build(model, df)
+
+    assert table.thresholds is None
+    assert table.validate(model, samples=100)
+    assert table.max_relative_error < 1e-3
+
+
+@pytest.mark.parametrize("overrides", [
+    {"ram": 12.0},                  # not in the training grid
+    {"condition": 7},               # pinned feature set by the request
+    {"panel_dot": None},            # flag missing
+])
+def test_rows_off_the_grid_fall_back_to_the_model(overrides):
+    df = training_frame()
+    model = fit(RandomForestRegressor(n_estimators=5, random_state=0), df)
+    table = PriceLookupTable.build(model, df)
+
+    assert table.lookup(request_row(**overrides)) is None
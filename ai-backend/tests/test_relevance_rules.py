@@ -0,0 +1,33 @@
+import pytest
+
+from relevance_rules import rule_decision
+
+
+@pytest.mark.parametrize("title", [
+    "Top 10 Best Phones Under 50000 in Pakistan",
+    "5 Best Gaming Phones of 2025",
+    "Best Mobiles Under 30k - My Top Picks",
+    "Best Camera Smartphones 2025",
+])
+def test_list_titles_are_accepted(title):
+    assert rule_decision(title) is True
+
+
+@pytest.mark.parametrize("title", [
+    "Samsung S24 Ultra vs iPhone 15 Pro Max",
+    "Top 3 Phones of 2025",
+    "Infinix Hot 50 Unboxing",
+    "Pixel 10 Pro Leaks and Launch Date",
+])
+def test_single_phone_and_comparison_titles_are_rejected(title):
+    assert rule_decision(title) is False
+
+
+@pytest.mark.parametrize("title", [
+    "Is this the best gaming phone? ROG Phone 8",
+    "Best Phone of 2025 - Pixel 9 Pro",
+    "Infinix GT 20 Pro - The Best Gaming Phone Under 70k?",
+    "Best Phones of 2025 - Full Review",
+])
+def test_unclear_titles_go_to_the_llm(title):
+    assert rule_decision(title) is None
@@ -0,0 +1,76 @@
+import math
+
+import pytest
+
+from models import NewMobile
+from RecommendationEngine.spec_ranker import (
+    DEFAULT_CHIPSET_TIER,
+    SpecCatalogue,
+    parse_camera,
+    parse_chipset_tier,
+    parse_memory_gb,
+)
+
+
+@pytest.mark.parametrize("chipset, tier", [
+    ("Qualcomm Snapdragon 8 Gen 3", 1.0),
+    ("Snapdragon 8 Elite", 1.0),
+    ("Snapdragon 8+ Gen 1", 1.0),
+    ("Snapdragon 8s Gen 3", 0.9),
+    ("Snapdragon 888", 0.8),
+    ("Snapdragon 7s Gen 2", 0.6),
+    ("Snapdragon 7+ Gen 3", 0.6),
+    ("Snapdragon 778G", 0.6),
+    ("Snapdragon 6s Gen 3", 0.42),
+    ("Snapdragon 685", 0.42),
+    ("Snapdragon 4s Gen 2", 0.28),
+    ("Snapdragon 680", 0.42),
+    ("MediaTek Dimensity 9300+", 1.0),
+    ("Dimensity 8200 Ultra", 0.78),
+    ("Dimensity 7300 Energy", 0.6),
+    ("Dimensity 6100+", 0.42),
+    ("Helio G99", 0.42),
+    ("Helio G85", 0.35),
+    ("Helio P35", 0.22),
+    ("Apple A17 Pro", 0.92),
+    ("A18 Bionic", 1.0),
+    ("Google Tensor G3", 0.8),
+    ("Exynos 2400", 0.85),
+    ("Exynos 1380", 0.5),
+    ("Unisoc T606", 0.15),
+    ("Kirin 9000S", 0.8),
+    ("Some unknown SoC", DEFAULT_CHIPSET_TIER),
+])
+def test_chipset_tiers(chipset, tier):
+    assert parse_chipset_tier(chipset) == tier
+
+
+def test_chipset_tier_unknown_when_missing():
+    assert math.isnan(parse_chipset_tier(None))
+
+
+@pytest.mark.parametrize("text, expected", [("8GB", 8), ("8/12 GB", 12), ("1TB", 1024), ("256 GB", 256)])
+def test_parse_memory_gb(text, expected):
+    assert parse_memory_gb(text) == expected
+
+
+def test_parse_camera():
+    assert parse_camera("50 MP + 8 MP + 2 MP") == (50.0, 3.0)
+
+
+def test_rank_respects_budget_and_profile():
+    catalogue = SpecCatalogue([
+        NewMobile(brand="A", model="Gamer", chipset="Snapdragon 8 Gen 2", ram="12GB", price="95000",
+                  screen_resolution="1080 x 2400, 144Hz", battery_capacity="4500 mAh"),
+        NewMobile(brand="B", model="Marathon", chipset="Helio G85", ram="4GB", price="40000",
+                  battery_capacity="7000 mAh"),
+        NewMobile(brand="C", model="Flagship", chipset="Snapdragon 8 Elite", price="250000"),
+    ])
+
+    gaming = catalogue.rank(100000, "gaming")
+    assert [r["model"] for r in gaming] == ["Gamer", "Marathon"]
+
+    battery = catalogue.rank(100000, "battery")
+    assert battery[0]["model"] == "Marathon"
+
+    assert catalogue.rank(10000, "value") == []
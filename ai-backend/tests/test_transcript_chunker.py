@@ -0,0 +1,62 @@
+from transcript_chunker import (
+    chunk_characters,
+    chunk_token_budget,
+    chunk_transcript,
+    estimate_tokens,
+    pack_units,
+    split_units,
+)
+
+
+def transcript(entries=200):
+    return "\n".join(f"Entry {i}: the phone has a great display and battery." for i in range(entries))
+
+
+def test_budget_leaves_room_for_prompt_and_answer():
+    assert chunk_token_budget("gpt-4o-mini") == 128_000 - 1_000 - 8_192
+    assert chunk_token_budget("unknown-model") == 32_000 - 1_000 - 8_192
+
+
+def test_chunks_respect_token_budget_and_entry_boundaries():
+    text = transcript()
+    chunks = chunk_transcript(text, max_tokens=200, overlap_tokens=30)
+
+    assert len(chunks) > 1
+    entries = set(text.splitlines())
+    for chunk in chunks:
+        assert estimate_tokens(chunk) <= 200
+        assert all(line in entries for line in chunk.splitlines())
+
+
+def test_consecutive_chunks_overlap_by_whole_entries():
+    chunks = chunk_transcript(transcript(), max_tokens=200, overlap_tokens=30)
+
+    for previous, current in zip(chunks, chunks[1:]):
+        assert current.splitlines()[0] in previous.splitlines()
+
+
+def test_everything_is_kept_in_order():
+    text = transcript(50)
+    chunks = chunk_transcript(text, max_tokens=150, overlap_tokens=0)
+    assert "\n".join(chunks) == text
+
+
+def test_long_entries_split_at_sentences_then_words():
+    long_entry = "First sentence here. " * 20 + "word " * 200
+    units = split_units(long_entry, max_size=100)
+
+    assert all(len(unit) <= 100 for unit in units)
+    assert units[0] == "First sentence here."
+
+
+def test_overlap_never_exceeds_budget():
+    chunks = pack_units(["a" * 60, "b" * 60, "c" * 90], max_size=100, overlap=80)
+    assert chunks == ["a" * 60, "b" * 60, "c" * 90]
+
+
+def test_character_chunks_for_translation():
+    text = transcript(300)
+    chunks = chunk_characters(text, 5000)
+
+    assert all(len(chunk) <= 5000 for chunk in chunks)
+    assert "\n".join(chunks) == text